@@ -1,15 +1,41 @@
-import socket
-import tkinter as tk
-from tkinter import ttk, messagebox
-import webbrowser
+import time
+
+_STARTED = time.perf_counter()
+
+import argparse
+import sys
 import threading
 import os
+import queue
 import json
-import time
-import pyperclip  # For clipboard functionality
+from analysis import (CHUNK_SIZE, DEFAULT_LOCALE, LOCALE_VOWELS, AnalysisCancelled, AnalysisResult,
+                      IncrementalAnalyzer, analyze_file, render_window)
+from convert import TITLES, iter_conversion, iter_file_conversion, write_conversions
+
+# Tk and the GUI-only modules are imported by load_gui() when a window is
+# opened; network and batch/service modules where they are used. Headless
+# runs then never pay for Tk or need a display.
+tk = ttk = messagebox = filedialog = None
+
+
+def load_gui():
+    global tk, ttk, messagebox, filedialog, VirtualTextView
+    global ResultCache, content_digest, EntryStore, data_dir, Instrumentation
+    import tkinter as tk
+    from tkinter import ttk, messagebox, filedialog
+    from widgets import VirtualTextView
+    from cache import ResultCache, content_digest
+    from store import EntryStore, data_dir
+    from instrument import Instrumentation
+
+
+def startup_ms():
+    # Milliseconds since this module started loading
+    return (time.perf_counter() - _STARTED) * 1000
 
 class TextAnalyzerApp:
     def __init__(self, master):
+        load_gui()
         self.master = master
         self.master.title("Text Analyzer")
         self.master.minsize(600, 500)
@@ -34,6 +60,17 @@ class TextAnalyzerApp:
         master.rowconfigure(0, weight=1)
         master.columnconfigure(0, weight=1)
 
+        # History and favorites live in an indexed store in the user's data
+        # directory; the old history.txt/favorites.txt are imported once
+        self.store = EntryStore()
+        self.store.import_lines("history", "history.txt")
+        self.store.import_lines("favorites", "favorites.txt")
+        self.history_items = []
+        self.fav_items = []
+        self.last_result = None
+        # Opt-in per-stage timings, shown under Advanced Options
+        self.instrument = Instrumentation()
+
         self.create_top_section()
         self.create_input_section()
         self.create_output_section()
@@ -47,6 +84,33 @@ class TextAnalyzerApp:
         self.refresh_interval = 10000  # milliseconds
         self.master.after(self.refresh_interval, self.check_auto_refresh)
 
+        # Background analysis: one long-lived worker takes jobs from a queue
+        # and hands results back; only the Tk main loop touches widgets.
+        self.jobs = queue.Queue()
+        self.results = queue.Queue()
+        self.incremental = IncrementalAnalyzer()
+        # Recalled texts (history, favorites, auto-refresh) hit this cache
+        self.cache = ResultCache(path=os.path.join(data_dir(), "analysis_cache.json"))
+        self.persist_cache = tk.BooleanVar(value=True)
+        self.cache.load()
+        self.master.protocol("WM_DELETE_WINDOW", self.on_close)
+        self.job_id = 0
+        self.job_cancel = None
+        self.poll_interval = 16  # milliseconds, about one frame at 60 fps
+        self.worker = threading.Thread(target=self.analysis_worker, daemon=True)
+        self.worker.start()
+        self.master.after(self.poll_interval, self.poll_results)
+        self.master.after_idle(self.show_startup_time)
+
+        # Vowels used for the vowel/consonant counts (Advanced Options)
+        self.locale = DEFAULT_LOCALE
+
+        # Domain lookups (Advanced Options); the resolver keeps its TTL cache
+        self.resolver = None
+        self.ping_queue = queue.Queue()
+        self.ping_run = 0
+        self.ping_results = []
+
     def set_theme(self, theme):
         if theme == "light":
             bg = "#F5F5F5"
@@ -88,14 +152,23 @@ class TextAnalyzerApp:
         input_frame.grid(row=1, column=0, sticky="ew", pady=5)
         input_frame.columnconfigure(1, weight=1)
 
-        ttk.Label(input_frame, text="Enter Text:").grid(row=0, column=0, sticky="e", padx=5, pady=5)
-        self.text_entry = ttk.Entry(input_frame)
-        self.text_entry.grid(row=0, column=1, sticky="ew", padx=5, pady=5)
-        self.clear_input_btn = ttk.Button(input_frame, text="Clear Input", command=lambda: self.text_entry.delete(0, tk.END))
-        self.clear_input_btn.grid(row=0, column=2, padx=5, pady=5)
+        ttk.Label(input_frame, text="Enter Text:").grid(row=0, column=0, sticky="ne", padx=5, pady=5)
+        text_frame = ttk.Frame(input_frame)
+        text_frame.grid(row=0, column=1, sticky="ew", padx=5, pady=5)
+        text_frame.columnconfigure(0, weight=1)
+        self.text_input = tk.Text(text_frame, height=5, wrap="word", undo=False, font=("Helvetica", 12))
+        self.text_input.grid(row=0, column=0, sticky="ew")
+        self.input_scroll = ttk.Scrollbar(text_frame, orient="vertical", command=self.text_input.yview)
+        self.input_scroll.grid(row=0, column=1, sticky="ns")
+        self.text_input.config(yscrollcommand=self.input_scroll.set)
+        # Edits mark the input dirty so auto-refresh can skip unchanged text
+        self.input_dirty = False
+        self.text_input.bind("<<Modified>>", self.on_input_changed)
+        self.clear_input_btn = ttk.Button(input_frame, text="Clear Input", command=lambda: self.set_input(""))
+        self.clear_input_btn.grid(row=0, column=2, sticky="n", padx=5, pady=5)
 
         # Process button
-        self.process_btn = ttk.Button(input_frame, text="Process Text", command=self.threaded_process)
+        self.process_btn = ttk.Button(input_frame, text="Process Text", command=self.process_text)
         self.process_btn.grid(row=1, column=0, columnspan=3, pady=10)
 
         # Progress bar for processing indication
@@ -112,28 +185,27 @@ class TextAnalyzerApp:
         self.notebook.add(self.conv_frame, text="Conversions")
         self.conv_frame.columnconfigure(1, weight=1)
         
-        ttk.Label(self.conv_frame, text="Original:").grid(row=0, column=0, sticky="e", padx=5, pady=5)
-        self.orig_label = ttk.Label(self.conv_frame, text="")
-        self.orig_label.grid(row=0, column=1, sticky="w", padx=5, pady=5)
-        
-        ttk.Label(self.conv_frame, text="Lower Case:").grid(row=1, column=0, sticky="e", padx=5, pady=5)
-        self.lower_label = ttk.Label(self.conv_frame, text="")
-        self.lower_label.grid(row=1, column=1, sticky="w", padx=5, pady=5)
-        
-        ttk.Label(self.conv_frame, text="Upper Case:").grid(row=2, column=0, sticky="e", padx=5, pady=5)
-        self.upper_label = ttk.Label(self.conv_frame, text="")
-        self.upper_label.grid(row=2, column=1, sticky="w", padx=5, pady=5)
-        
-        ttk.Label(self.conv_frame, text="Title Case:").grid(row=3, column=0, sticky="e", padx=5, pady=5)
-        self.titlecase_label = ttk.Label(self.conv_frame, text="")
-        self.titlecase_label.grid(row=3, column=1, sticky="w", padx=5, pady=5)
+        # One virtualized pane per conversion; only the selected one renders
+        self.conv_notebook = ttk.Notebook(self.conv_frame)
+        self.conv_notebook.grid(row=0, column=0, columnspan=2, sticky="nsew")
+        self.conv_frame.rowconfigure(0, weight=1)
+        self.conv_views = {}
+        for name, title in (("original", "Original"), ("lower", "Lower Case"), ("upper", "Upper Case"),
+                            ("title", "Title Case"), ("reversed", "Reversed Text")):
+            view = VirtualTextView(self.conv_notebook)
+            self.conv_notebook.add(view, text=title)
+            self.conv_views[name] = view
         
-        ttk.Label(self.conv_frame, text="Reversed Text:").grid(row=4, column=0, sticky="e", padx=5, pady=5)
-        self.reversed_label = ttk.Label(self.conv_frame, text="")
-        self.reversed_label.grid(row=4, column=1, sticky="w", padx=5, pady=5)
-        
-        self.copy_conv_btn = ttk.Button(self.conv_frame, text="Copy Conversions", command=self.copy_conversions)
-        self.copy_conv_btn.grid(row=5, column=0, columnspan=2, pady=10)
+        # Copy or save all conversions or just one; each is computed and
+        # written chunk by chunk
+        conv_actions = ttk.Frame(self.conv_frame)
+        conv_actions.grid(row=1, column=0, columnspan=2, pady=10)
+        self.conv_output = tk.StringVar(value="All")
+        ttk.Combobox(conv_actions, textvariable=self.conv_output, state="readonly", width=12,
+                     values=["All"] + list(TITLES.values())).grid(row=0, column=0, padx=5)
+        self.copy_conv_btn = ttk.Button(conv_actions, text="Copy Conversions", command=self.copy_conversions)
+        self.copy_conv_btn.grid(row=0, column=1, padx=5)
+        ttk.Button(conv_actions, text="Save As...", command=self.save_conversions).grid(row=0, column=2, padx=5)
         
         # Analysis tab
         self.analysis_frame = ttk.Frame(self.notebook, padding=10)
@@ -160,9 +232,54 @@ class TextAnalyzerApp:
         self.consonant_count_label = ttk.Label(self.analysis_frame, text="")
         self.consonant_count_label.grid(row=4, column=1, sticky="w", padx=5, pady=5)
         
+        self.create_frequency_section(self.analysis_frame)
+        
         self.clear_output_btn = ttk.Button(self.container, text="Clear Output", command=self.clear_output)
         self.clear_output_btn.grid(row=3, column=0, pady=10)
 
+    def create_frequency_section(self, parent):
+        # Top words and n-grams; opt-in since they are gathered by re-scanning
+        # the whole text rather than only the edited part
+        self.show_frequencies = tk.BooleanVar(value=False)
+        ttk.Checkbutton(parent, text="Word Frequency", variable=self.show_frequencies,
+                        command=self.on_frequencies_toggled).grid(row=5, column=0, sticky="w", padx=5, pady=5)
+        self.freq_summary_label = ttk.Label(parent, text="")
+        self.freq_summary_label.grid(row=5, column=1, sticky="w", padx=5, pady=5)
+        freq_frame = ttk.Frame(parent)
+        freq_frame.grid(row=6, column=0, columnspan=2, sticky="nsew", padx=5, pady=5)
+        parent.rowconfigure(6, weight=1)
+        self.freq_trees = {}
+        for column, (name, title) in enumerate((("words", "Word"), ("word_ngrams", "Word Pair"),
+                                                ("char_ngrams", "Trigram"))):
+            freq_frame.columnconfigure(column, weight=1)
+            tree = ttk.Treeview(freq_frame, columns=("count",), height=8)
+            tree.heading("#0", text=title)
+            tree.heading("count", text="Count")
+            tree.column("#0", width=140)
+            tree.column("count", width=70, anchor="e")
+            tree.grid(row=0, column=column, sticky="nsew", padx=2)
+            self.freq_trees[name] = tree
+
+    def on_frequencies_toggled(self):
+        if self.show_frequencies.get():
+            if self.last_result is not None and self.get_input():
+                self.process_text()
+        else:
+            self.show_frequency_result(None)
+
+    def show_frequency_result(self, freqs):
+        for tree in self.freq_trees.values():
+            tree.delete(*tree.get_children())
+        if freqs is None:
+            self.freq_summary_label.config(text="")
+            return
+        note = "exact" if freqs.exact else "approximate"
+        self.freq_summary_label.config(
+            text=f"{freqs.words.total} words, {freqs.words.distinct()} distinct ({note})")
+        for name, tree in self.freq_trees.items():
+            for key, count in getattr(freqs, name).top():
+                tree.insert("", tk.END, text=key, values=(count,))
+
     def create_history_and_favorites_section(self):
         mid_frame = ttk.Frame(self.container)
         mid_frame.grid(row=4, column=0, sticky="nsew", pady=5)
@@ -206,6 +323,11 @@ class TextAnalyzerApp:
         self.adv_options_btn = ttk.Button(bottom_frame, text="Advanced Options", command=self.open_advanced_options)
         self.adv_options_btn.grid(row=0, column=0, padx=5, pady=5, sticky="ew")
 
+    def show_startup_time(self):
+        # Runs once the window has been drawn for the first time
+        self.startup_time = startup_ms()
+        self.set_status(f"Ready (started in {self.startup_time:.0f} ms)")
+
     def create_status_bar(self):
         self.status_bar = ttk.Label(self.master, textvariable=self.status_var, relief="sunken", anchor="w", font=("Helvetica", 10))
         self.status_bar.grid(row=6, column=0, sticky="ew")
@@ -214,7 +336,7 @@ class TextAnalyzerApp:
         self.menu = tk.Menu(self.master)
         file_menu = tk.Menu(self.menu, tearoff=0)
         file_menu.add_command(label="About", command=self.show_about)
-        file_menu.add_command(label="Exit", command=self.master.destroy)
+        file_menu.add_command(label="Exit", command=self.on_close)
         self.menu.add_cascade(label="File", menu=file_menu)
         help_menu = tk.Menu(self.menu, tearoff=0)
         help_menu.add_command(label="Contact", command=lambda: messagebox.showinfo("Contact", "Email: your_email@example.com"))
@@ -225,58 +347,153 @@ class TextAnalyzerApp:
         self.current_theme = "dark" if self.current_theme == "light" else "light"
         self.set_theme(self.current_theme)
 
-    def threaded_process(self):
-        threading.Thread(target=self.process_text, daemon=True).start()
+    def get_input(self):
+        return self.text_input.get("1.0", "end-1c")
+
+    def set_input(self, text):
+        self.text_input.delete("1.0", tk.END)
+        self.text_input.insert("1.0", text)
 
     def process_text(self):
-        self.set_status("Processing text...")
-        self.progress.start(10)
-        phrase = self.text_entry.get()
+        phrase = self.get_input()
         if not phrase:
             messagebox.showerror("Input Error", "Please enter some text.")
-            self.progress.stop()
             self.set_status("Ready")
             return
-        # Conversions
-        self.orig_label.config(text=phrase)
-        self.lower_label.config(text=phrase.lower())
-        self.upper_label.config(text=phrase.upper())
-        self.titlecase_label.config(text=phrase.title())
-        self.reversed_label.config(text=phrase[::-1])
-        # Analysis
-        self.letter_count_label.config(text=str(len(phrase)))
-        words = phrase.split()
-        self.word_count_label.config(text=str(len(words)))
-        sentences = [s for s in phrase.replace("!",".").replace("?",".").split(".") if s.strip()]
-        self.sentence_count_label.config(text=str(len(sentences)))
-        vowels = sum(1 for char in phrase.lower() if char in "aeiou")
-        self.vowel_count_label.config(text=str(vowels))
-        consonants = sum(1 for char in phrase.lower() if char.isalpha() and char not in "aeiou")
-        self.consonant_count_label.config(text=str(consonants))
-        self.add_history(phrase)
-        self.progress.stop()
-        self.set_status("Text processed successfully")
+        self.input_dirty = False
+        # Newer input supersedes whatever the worker is still busy with
+        if self.job_cancel is not None:
+            self.job_cancel.set()
+        self.job_id += 1
+        self.job_cancel = threading.Event()
+        self.jobs.put((self.job_id, phrase, self.job_cancel, self.show_frequencies.get(), self.locale))
+        self.set_status("Processing text...")
+        self.progress.start(10)
+
+    def analysis_worker(self):
+        # Runs on the worker thread: compute only, never touch Tk here
+        while True:
+            job_id, phrase, cancel, frequencies, locale = self.jobs.get()
+            if cancel.is_set():
+                continue
+            try:
+                with self.instrument.run("analysis"):
+                    result, cached = self.instrument.call(self.analyze_job, phrase, cancel, frequencies, locale)
+            except AnalysisCancelled:
+                continue
+            except Exception as e:
+                self.results.put((job_id, None, e, False))
+            else:
+                self.results.put((job_id, result, None, cached))
+
+    def analyze_job(self, phrase, cancel, frequencies=False, locale=DEFAULT_LOCALE):
+        stage = self.instrument.stage
+        with stage("cache.lookup"):
+            # Counts for other locales are cached under their own keys
+            key = content_digest(phrase if locale == DEFAULT_LOCALE else f"{locale}\0{phrase}")
+            result = self.cache.get(phrase, key)
+        cached = result is not None
+        freqs = None
+        if frequencies and (result is None or result.frequencies is None):
+            from frequency import WordFrequencies
+            freqs = WordFrequencies()
+        if not cached:
+            if self.incremental.locale != locale:
+                self.incremental = IncrementalAnalyzer(locale=locale)
+            # Frequencies are gathered in the same pass as the counts
+            observe = (lambda block: freqs.feed(block, cancel, stage)) if freqs is not None else None
+            result = self.incremental.analyze(phrase, cancel, stage, observe)
+            result.frequencies = freqs
+        elif freqs is not None:
+            # The counts are cached; frequencies are kept on the result once computed
+            result.frequencies = freqs.feed(phrase, cancel, stage)
+        if not cached:
+            with stage("cache.store"):
+                self.cache.put(phrase, result, key)
+        return result, cached
+
+    def poll_results(self):
+        try:
+            while True:
+                job_id, result, error, cached = self.results.get_nowait()
+                if job_id != self.job_id:
+                    continue
+                self.job_cancel = None
+                self.progress.stop()
+                if error is not None:
+                    messagebox.showerror("Processing Error", f"Error: {error}")
+                    self.set_status("Ready")
+                else:
+                    self.show_result(result, cached)
+        except queue.Empty:
+            pass
+        self.master.after(self.poll_interval, self.poll_results)
+
+    def show_result(self, result, cached=False):
+        self.instrument.call(self.display_result, result)
+        self.update_cache_label()
+        self.set_status("Text processed successfully (cached)" if cached else "Text processed successfully")
+
+    def display_result(self, result):
+        phrase = result.text
+        with self.instrument.run("display"):
+            with self.instrument.stage("widget.update"):
+                # Conversions are rendered lazily, one visible window at a time
+                for name, view in self.conv_views.items():
+                    view.set_source(len(phrase), lambda start, end, n=name: self.render_conversion(phrase, n, start, end),
+                                    phrase, reverse=name == "reversed")
+                # Analysis
+                self.letter_count_label.config(text=str(result.letters))
+                self.word_count_label.config(text=str(result.words))
+                self.sentence_count_label.config(text=str(result.sentences))
+                self.vowel_count_label.config(text=str(result.vowels))
+                self.consonant_count_label.config(text=str(result.consonants))
+                self.show_frequency_result(result.frequencies if self.show_frequencies.get() else None)
+            self.last_result = result
+            with self.instrument.stage("history.save"):
+                self.add_history(phrase, self.storable_stats(result))
+
+    def render_conversion(self, phrase, name, start, end):
+        with self.instrument.stage(f"conversion.{name}"):
+            return render_window(phrase, name, start, end)
+
+    def selected_conversions(self):
+        choice = self.conv_output.get()
+        return [name for name, title in TITLES.items() if choice in ("All", title)]
 
     def copy_conversions(self):
-        text = (f"Original: {self.orig_label.cget('text')}\n"
-                f"Lower Case: {self.lower_label.cget('text')}\n"
-                f"Upper Case: {self.upper_label.cget('text')}\n"
-                f"Title Case: {self.titlecase_label.cget('text')}\n"
-                f"Reversed: {self.reversed_label.cget('text')}\n")
-        pyperclip.copy(text)
+        result = self.last_result
+        if result is None:
+            return
+        self.master.clipboard_clear()
+        with self.instrument.stage("conversion.copy"):
+            write_conversions(result.text, self.selected_conversions(), self.master.clipboard_append)
         self.set_status("Conversion data copied to clipboard")
 
+    def save_conversions(self):
+        result = self.last_result
+        if result is None:
+            return
+        path = filedialog.asksaveasfilename(defaultextension=".txt", filetypes=[("Text", "*.txt")])
+        if not path:
+            return
+        try:
+            with open(path, "w", encoding="utf-8") as f, self.instrument.stage("conversion.save"):
+                write_conversions(result.text, self.selected_conversions(), f.write)
+        except OSError as e:
+            messagebox.showerror("Save Error", f"Error: {e}")
+            return
+        self.set_status(f"Conversions saved to {path}")
+
     def clear_output(self):
-        self.orig_label.config(text="")
-        self.lower_label.config(text="")
-        self.upper_label.config(text="")
-        self.titlecase_label.config(text="")
-        self.reversed_label.config(text="")
+        for view in self.conv_views.values():
+            view.set_source(0, None)
         self.letter_count_label.config(text="")
         self.word_count_label.config(text="")
         self.sentence_count_label.config(text="")
         self.vowel_count_label.config(text="")
         self.consonant_count_label.config(text="")
+        self.show_frequency_result(None)
         self.set_status("Output cleared")
 
     def show_about(self):
@@ -292,76 +509,68 @@ class TextAnalyzerApp:
         self.status_var.set(text)
 
     # History functions
+    def list_preview(self, text):
+        # Listbox rows are single-line previews; the full text is kept aside
+        preview = text[:200].replace("\n", " \u23ce ")
+        return preview + "\u2026" if len(text) > 200 else preview
+
+    def storable_stats(self, result):
+        # History and favorites keep stats to prime the cache on recall, and
+        # recall assumes the default vowels
+        return result.stats if self.locale == DEFAULT_LOCALE else None
+
     def get_history(self):
-        if os.path.exists("history.txt"):
-            try:
-                with open("history.txt", "r") as f:
-                    return f.read().splitlines()
-            except Exception:
-                return []
-        return []
+        return self.store.texts("history")
 
-    def save_history(self, history):
-        try:
-            with open("history.txt", "w") as f:
-                f.write("\n".join(history))
-        except Exception as e:
-            print("Error saving history:", e)
-
-    def add_history(self, query):
-        history = self.get_history()
-        if query not in history:
-            history.insert(0, query)
-            history = history[:10]
-            self.save_history(history)
-            self.load_history()
+    def add_history(self, query, stats=None):
+        if self.store.add("history", query, stats):
+            self.history_items.insert(0, query)
+            self.history_listbox.insert(0, self.list_preview(query))
+            limit = self.store.retention("history")
+            del self.history_items[limit:]
+            self.history_listbox.delete(limit, tk.END)
 
     def load_history(self):
-        history = self.get_history()
+        with self.instrument.stage("history.load"):
+            self.history_items = self.get_history()
         self.history_listbox.delete(0, tk.END)
-        for item in history:
-            self.history_listbox.insert(tk.END, item)
+        for item in self.history_items:
+            self.history_listbox.insert(tk.END, self.list_preview(item))
 
     def clear_history(self):
         if messagebox.askyesno("Clear History", "Are you sure you want to clear history?"):
-            if os.path.exists("history.txt"):
-                os.remove("history.txt")
+            self.store.clear("history")
             self.load_history()
             self.set_status("History cleared")
 
+    def recall(self, kind, text):
+        # Put a stored text back in the input, priming the cache with its
+        # stored stats so processing it again costs almost nothing
+        stats = self.store.stats(kind, text)
+        if stats is not None and stats.letters == len(text):
+            self.cache.put(text, AnalysisResult(text, stats))
+        self.set_input(text)
+
     def on_history_double_click(self, event):
         selection = self.history_listbox.curselection()
         if selection:
-            text = self.history_listbox.get(selection[0])
-            self.text_entry.delete(0, tk.END)
-            self.text_entry.insert(0, text)
+            self.recall("history", self.history_items[selection[0]])
 
     # Favorites functions
     def get_favorites(self):
-        if os.path.exists("favorites.txt"):
-            try:
-                with open("favorites.txt", "r") as f:
-                    return f.read().splitlines()
-            except Exception:
-                return []
-        return []
-
-    def save_favorites(self, favs):
-        try:
-            with open("favorites.txt", "w") as f:
-                f.write("\n".join(favs))
-        except Exception as e:
-            print("Error saving favorites:", e)
+        return self.store.texts("favorites")
 
     def add_favorite(self):
-        text = self.text_entry.get().strip()
+        text = self.get_input().strip()
         if text:
-            favs = self.get_favorites()
-            if text not in favs:
-                favs.insert(0, text)
-                favs = favs[:10]
-                self.save_favorites(favs)
-                self.load_favorites()
+            result = self.last_result
+            stats = self.storable_stats(result) if result is not None and result.text == text else None
+            if self.store.add("favorites", text, stats):
+                self.fav_items.insert(0, text)
+                self.fav_listbox.insert(0, self.list_preview(text))
+                limit = self.store.retention("favorites")
+                del self.fav_items[limit:]
+                self.fav_listbox.delete(limit, tk.END)
                 self.set_status("Added to favorites")
             else:
                 self.set_status("Already in favorites")
@@ -369,24 +578,36 @@ class TextAnalyzerApp:
             messagebox.showerror("Input Error", "Enter text to add as favorite.")
 
     def load_favorites(self):
-        favs = self.get_favorites()
+        with self.instrument.stage("favorites.load"):
+            self.fav_items = self.get_favorites()
         self.fav_listbox.delete(0, tk.END)
-        for fav in favs:
-            self.fav_listbox.insert(tk.END, fav)
+        for fav in self.fav_items:
+            self.fav_listbox.insert(tk.END, self.list_preview(fav))
 
     def clear_favorites(self):
         if messagebox.askyesno("Clear Favorites", "Are you sure you want to clear favorites?"):
-            if os.path.exists("favorites.txt"):
-                os.remove("favorites.txt")
+            self.store.clear("favorites")
             self.load_favorites()
             self.set_status("Favorites cleared")
 
     def on_fav_double_click(self, event):
         selection = self.fav_listbox.curselection()
         if selection:
-            fav = self.fav_listbox.get(selection[0])
-            self.text_entry.delete(0, tk.END)
-            self.text_entry.insert(0, fav)
+            self.recall("favorites", self.fav_items[selection[0]])
+
+    def set_retention(self, kind, limit):
+        try:
+            limit = int(limit)
+        except ValueError:
+            return
+        if limit < 1:
+            return
+        self.store.set_retention(kind, limit)
+        if kind == "history":
+            self.load_history()
+        else:
+            self.load_favorites()
+        self.set_status(f"Keeping {limit} {kind} entries")
 
     # Advanced Options dialog with Ping and Auto Refresh
     def open_advanced_options(self):
@@ -398,42 +619,335 @@ class TextAnalyzerApp:
         adv_win.geometry("")
         
         ttk.Label(adv_win, text="Advanced Options", font=("Helvetica", 16, "bold")).grid(row=0, column=0, columnspan=2, pady=10)
-        # Ping Domain button
-        ttk.Button(adv_win, text="Ping Domain", command=self.ping_domain).grid(row=1, column=0, padx=10, pady=5, sticky="ew")
-        self.ping_result = ttk.Label(adv_win, text="Ping: N/A", font=("Helvetica", 12))
-        self.ping_result.grid(row=1, column=1, padx=10, pady=5, sticky="w")
+        # Domain lookups
+        self.create_resolver_panel(adv_win).grid(row=1, column=0, columnspan=2, padx=10, pady=5, sticky="nsew")
         # Auto Refresh option
         self.auto_refresh_enabled = tk.BooleanVar(value=False)
         ttk.Checkbutton(adv_win, text="Auto Refresh Analysis", variable=self.auto_refresh_enabled).grid(row=2, column=0, columnspan=2, padx=10, pady=5)
         # Favorite Option
         ttk.Button(adv_win, text="Add Text to Favorites", command=self.add_favorite).grid(row=3, column=0, columnspan=2, padx=10, pady=5)
-        ttk.Button(adv_win, text="Close", command=adv_win.destroy).grid(row=4, column=0, columnspan=2, pady=10)
+        # Result cache
+        self.cache_label = ttk.Label(adv_win, text="", font=("Helvetica", 12))
+        self.cache_label.grid(row=4, column=0, columnspan=2, padx=10, pady=5)
+        self.update_cache_label()
+        ttk.Checkbutton(adv_win, text="Persist Cache to Disk", variable=self.persist_cache).grid(row=5, column=0, padx=10, pady=5, sticky="w")
+        ttk.Button(adv_win, text="Clear Cache", command=self.clear_cache).grid(row=5, column=1, padx=10, pady=5, sticky="ew")
+        # History/favorites retention
+        for row, kind in ((6, "history"), (7, "favorites")):
+            ttk.Label(adv_win, text=f"Keep {kind.title()} Entries:").grid(row=row, column=0, padx=10, pady=5, sticky="e")
+            limit = tk.StringVar(value=str(self.store.retention(kind)))
+            spin = ttk.Spinbox(adv_win, from_=1, to=100000, width=8, textvariable=limit,
+                               command=lambda k=kind, v=limit: self.set_retention(k, v.get()))
+            spin.grid(row=row, column=1, padx=10, pady=5, sticky="w")
+            spin.bind("<Return>", lambda e, k=kind, v=limit: self.set_retention(k, v.get()))
+        # Vowel locale
+        ttk.Label(adv_win, text="Vowel Locale:").grid(row=8, column=0, padx=10, pady=5, sticky="e")
+        locale = tk.StringVar(value=self.locale)
+        locale_box = ttk.Combobox(adv_win, textvariable=locale, values=sorted(LOCALE_VOWELS), state="readonly", width=6)
+        locale_box.grid(row=8, column=1, padx=10, pady=5, sticky="w")
+        locale_box.bind("<<ComboboxSelected>>", lambda e: self.set_locale(locale.get()))
+        self.create_instrument_panel(adv_win).grid(row=9, column=0, columnspan=2, padx=10, pady=5, sticky="nsew")
+        ttk.Button(adv_win, text="Close", command=adv_win.destroy).grid(row=10, column=0, columnspan=2, pady=10)
+
+    def set_locale(self, locale):
+        if locale == self.locale:
+            return
+        self.locale = locale
+        self.set_status(f"Counting vowels for locale {locale}")
+        if self.last_result is not None and self.get_input():
+            self.process_text()
+
+    def create_instrument_panel(self, parent):
+        panel = ttk.Labelframe(parent, text="Instrumentation", padding=5)
+        panel.columnconfigure(0, weight=1)
+        enabled = tk.BooleanVar(value=self.instrument.enabled)
+        allocations = tk.BooleanVar(value=self.instrument.track_allocations)
+        profiling = tk.BooleanVar(value=self.instrument.profiling)
+        options = ttk.Frame(panel)
+        options.grid(row=0, column=0, sticky="w")
+        ttk.Checkbutton(options, text="Record Timings", variable=enabled,
+                        command=lambda: setattr(self.instrument, "enabled", enabled.get())).grid(row=0, column=0, padx=5)
+        ttk.Checkbutton(options, text="Track Allocations", variable=allocations,
+                        command=lambda: self.instrument.set_track_allocations(allocations.get())).grid(row=0, column=1, padx=5)
+        ttk.Checkbutton(options, text="cProfile", variable=profiling,
+                        command=lambda: setattr(self.instrument, "profiling", profiling.get())).grid(row=0, column=2, padx=5)
+
+        columns = ("count", "mean", "p50", "p95", "max")
+        tree = ttk.Treeview(panel, columns=columns, height=8)
+        tree.heading("#0", text="Stage")
+        tree.column("#0", width=200)
+        for column, title in zip(columns, ("Samples", "Mean ms", "p50 ms", "p95 ms", "Max ms")):
+            tree.heading(column, text=title)
+            tree.column(column, width=80, anchor="e")
+        tree.grid(row=1, column=0, sticky="nsew", pady=5)
+
+        buttons = ttk.Frame(panel)
+        buttons.grid(row=2, column=0, sticky="ew")
+        ttk.Button(buttons, text="Export JSON", command=self.export_instrument_json).grid(row=0, column=0, padx=5)
+        ttk.Button(buttons, text="Save Profile", command=self.save_profile).grid(row=0, column=1, padx=5)
+        ttk.Button(buttons, text="Reset", command=self.instrument.reset).grid(row=0, column=2, padx=5)
+        self.refresh_instrument_panel(tree)
+        return panel
+
+    def refresh_instrument_panel(self, tree):
+        # Live breakdown, refreshed while the Advanced Options window is open
+        if not tree.winfo_exists():
+            return
+        tree.delete(*tree.get_children())
+        for stage, data in self.instrument.summary().items():
+            tree.insert("", tk.END, text=stage, values=(
+                data["count"], f"{data['mean_ns'] / 1e6:.3f}", f"{data['p50_ns'] / 1e6:.3f}",
+                f"{data['p95_ns'] / 1e6:.3f}", f"{data['max_ns'] / 1e6:.3f}"))
+        self.master.after(500, self.refresh_instrument_panel, tree)
+
+    def export_instrument_json(self):
+        path = filedialog.asksaveasfilename(defaultextension=".json", filetypes=[("JSON", "*.json")])
+        if path:
+            self.instrument.export_json(path)
+            self.set_status(f"Instrumentation exported to {path}")
+
+    def save_profile(self):
+        path = filedialog.asksaveasfilename(defaultextension=".pstats", filetypes=[("pstats", "*.pstats")])
+        if not path:
+            return
+        if self.instrument.dump_profile(path):
+            self.set_status(f"Profile saved to {path}")
+        else:
+            messagebox.showerror("Profile Error", "No profile to save yet. Enable cProfile and process some text, and wait for it to finish.")
+
+    def update_cache_label(self):
+        if getattr(self, "cache_label", None) is None or not self.cache_label.winfo_exists():
+            return
+        stats = self.cache.stats()
+        self.cache_label.config(text=(f"Cache: {stats['hits']} hits / {stats['misses']} misses, "
+                                      f"{stats['entries']} entries, {stats['bytes'] // 1024} KB"))
+
+    def clear_cache(self):
+        self.cache.clear()
+        self.update_cache_label()
+        self.set_status("Cache cleared")
+
+    def on_close(self):
+        if self.persist_cache.get():
+            self.cache.save()
+        self.store.close()
+        self.master.destroy()
+
+    def create_resolver_panel(self, parent):
+        panel = ttk.Labelframe(parent, text="Domain Lookup", padding=5)
+        panel.columnconfigure(1, weight=1)
+        ttk.Button(panel, text="Ping Domains", command=self.ping_domain).grid(row=0, column=0, padx=5, sticky="w")
+        self.ping_result = ttk.Label(panel, text="Ping: N/A", font=("Helvetica", 12))
+        self.ping_result.grid(row=0, column=1, padx=10, sticky="w")
+        self.ping_tree = ttk.Treeview(panel, columns=("address", "ms", "status"), height=5)
+        self.ping_tree.heading("#0", text="Domain")
+        self.ping_tree.column("#0", width=200)
+        for column, title, width in (("address", "Address", 120), ("ms", "ms", 70), ("status", "Status", 150)):
+            self.ping_tree.heading(column, text=title)
+            self.ping_tree.column(column, width=width, anchor="e" if column == "ms" else "w")
+        self.ping_tree.grid(row=1, column=0, columnspan=2, sticky="nsew", pady=5)
+        return panel
 
     def ping_domain(self):
-        text = self.text_entry.get().strip()
-        if not text:
-            messagebox.showerror("Input Error", "Enter text to ping (using first word as domain).")
+        # Every domain-like token is resolved on a background event loop;
+        # results stream back through a queue polled from the Tk loop
+        from resolver import DomainResolver, find_domains
+        domains = find_domains(self.get_input())
+        if not domains:
+            messagebox.showerror("Input Error", "Enter text containing a domain name to ping.")
             return
+        if self.resolver is None:
+            self.resolver = DomainResolver()
+        self.ping_run += 1
+        run = self.ping_run
+        self.ping_results = []
+        self.ping_tree.delete(*self.ping_tree.get_children())
+        self.ping_result.config(text=f"Ping: resolving {len(domains)} domain(s)...")
+        self.resolver.start(domains, lambda result: self.ping_queue.put((run, result)),
+                            lambda results: self.ping_queue.put((run, None)))
+        self.master.after(self.poll_interval, self.poll_ping, run)
+
+    def poll_ping(self, run):
+        if run != self.ping_run:
+            return
+        from resolver import latency_summary
+        done = False
         try:
-            domain = text.split()[0]
-            start = time.time()
-            socket.gethostbyname(domain)
-            elapsed = (time.time() - start) * 1000
-            self.ping_result.config(text=f"Ping: {int(elapsed)} ms")
-            self.set_status("Ping successful")
-        except Exception as e:
-            messagebox.showerror("Ping Error", f"Error: {str(e)}")
-            self.ping_result.config(text="Ping: Error")
-    
+            while True:
+                result_run, result = self.ping_queue.get_nowait()
+                if result_run != run:
+                    continue
+                if result is None:
+                    done = True
+                    break
+                self.ping_results.append(result)
+                self.show_ping_result(result)
+        except queue.Empty:
+            pass
+        summary = latency_summary([r["ms"] for r in self.ping_results if not r["cached"] and r["error"] is None])
+        failed = sum(r["error"] is not None for r in self.ping_results)
+        text = f"Ping: {len(self.ping_results) - failed} ok, {failed} failed"
+        if summary["count"]:
+            text += f" | min {summary['min']:.0f} / avg {summary['avg']:.0f} / p95 {summary['p95']:.0f} ms"
+        if self.ping_result.winfo_exists():
+            self.ping_result.config(text=text)
+        if done:
+            self.set_status("Ping finished")
+        else:
+            self.master.after(self.poll_interval, self.poll_ping, run)
+
+    def show_ping_result(self, result):
+        if not self.ping_tree.winfo_exists():
+            return
+        if result["error"] is not None:
+            status = result["error"]
+        else:
+            status = "cached" if result["cached"] else "ok"
+        self.ping_tree.insert("", tk.END, text=result["domain"], values=(
+            result["address"] or "", f"{result['ms']:.1f}", status))
+
+    def on_input_changed(self, event=None):
+        if self.text_input.edit_modified():
+            self.input_dirty = True
+            self.text_input.edit_modified(False)
+
     def check_auto_refresh(self):
-        if self.auto_refresh_enabled.get():
-            self.threaded_process()
+        # Only re-analyse when the input was edited since the last run
+        if self.auto_refresh_enabled.get() and self.input_dirty and self.get_input():
+            self.process_text()
         self.master.after(self.refresh_interval, self.check_auto_refresh)
-    
-    def threaded_process(self):
-        threading.Thread(target=self.process_text, daemon=True).start()
+
+def convert_files(paths, names, output=None):
+    # One conversion is written as is; several as "Title: text" lines.
+    # Unreadable files are reported on stderr; returns how many failed.
+    failed = 0
+    out = open(output, "w", encoding="utf-8") if output else sys.stdout
+    try:
+        for path in paths:
+            # Files are read chunk by chunk, once per conversion (opened
+            # first so a missing one fails before anything is written);
+            # stdin can only be read once, so it is read whole
+            try:
+                if path == "-":
+                    source, chunks = sys.stdin.read(), iter_conversion
+                else:
+                    open(path, "rb").close()
+                    source, chunks = path, iter_file_conversion
+                if len(names) == 1:
+                    for chunk in chunks(source, names[0]):
+                        out.write(chunk)
+                else:
+                    write_conversions(source, names, out.write, chunks=chunks)
+            except (OSError, ValueError) as e:
+                print(f"{path}: {e}", file=sys.stderr)
+                failed += 1
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    return failed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Text Analyzer")
+    parser.add_argument("files", nargs="*",
+                        help="files to analyse ('-' for stdin); opens the GUI when omitted")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE,
+                        help="bytes read per chunk when streaming files")
+    parser.add_argument("--stream", action="store_true",
+                        help="read files in chunks instead of memory-mapping them")
+    parser.add_argument("--batch", metavar="DIR_OR_GLOB", action="append",
+                        help="analyse every file in a directory or matching a glob across worker processes")
+    parser.add_argument("--serve", metavar="[HOST:]PORT",
+                        help="run as a local HTTP/JSON service instead of opening the GUI")
+    parser.add_argument("--unix", metavar="PATH", help="serve on a Unix domain socket instead of TCP")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="worker processes for --batch and --serve (default: CPU count)")
+    parser.add_argument("--split-size", type=int, default=None,
+                        help="bytes per piece when splitting large files across workers (default: 64 MiB)")
+    parser.add_argument("--batch-size", type=int, default=16,
+                        help="pieces handed to a worker at a time")
+    parser.add_argument("--frequencies", action="store_true",
+                        help="also report top words, word/character n-grams and distinct words")
+    parser.add_argument("--locale", choices=sorted(LOCALE_VOWELS), default=DEFAULT_LOCALE,
+                        help="vowels to count (default: en, aeiou)")
+    parser.add_argument("--convert", metavar="NAME", action="append", choices=list(TITLES),
+                        help="write this conversion of each file instead of counting; may be repeated")
+    parser.add_argument("-o", "--output",
+                        help="write the JSON lines (or --convert output) here instead of stdout")
+    parser.add_argument("--startup-time", action="store_true",
+                        help="print the time taken to start up to stderr")
+    args = parser.parse_args(argv)
+
+    def report_startup():
+        if args.startup_time:
+            print(f"Startup: {startup_ms():.1f} ms", file=sys.stderr, flush=True)
+
+    if args.serve or args.unix:
+        from service import DEFAULT_HOST, DEFAULT_PORT, run_service
+        report_startup()
+        host, _, port = (args.serve or "").rpartition(":")
+        run_service(host or DEFAULT_HOST, int(port or DEFAULT_PORT), args.unix, args.workers)
+        return
+
+    if args.batch:
+        from batch import SPLIT_SIZE, batch_records, find_files
+        report_startup()
+        paths = list(dict.fromkeys(path for pattern in args.batch for path in find_files(pattern)))
+        out = open(args.output, "w") if args.output else sys.stdout
+        failed = 0
+        try:
+            for record in batch_records(paths, args.workers, args.chunk_size,
+                                        args.split_size or SPLIT_SIZE, args.batch_size, args.frequencies,
+                                        args.locale):
+                failed += "error" in record
+                out.write(json.dumps(record) + "\n")
+        finally:
+            if out is not sys.stdout:
+                out.close()
+        if failed:
+            sys.exit(1)
+        return
+
+    if not args.files:
+        load_gui()
+        root = tk.Tk()
+        app = TextAnalyzerApp(root)
+        if args.startup_time:
+            root.after_idle(lambda: print(f"Startup: {app.startup_time:.1f} ms", file=sys.stderr, flush=True))
+        root.mainloop()
+        return
+
+    report_startup()
+    if args.convert:
+        if convert_files(args.files, args.convert, args.output):
+            sys.exit(1)
+        return
+    # Like --batch, a file that cannot be read gets an error record, the
+    # rest are still analysed, and the exit status is 1
+    out = open(args.output, "w") if args.output else sys.stdout
+    failed = 0
+    try:
+        for path in args.files:
+            freqs = None
+            if args.frequencies:
+                from frequency import WordFrequencies
+                freqs = WordFrequencies()
+            try:
+                stats = analyze_file(path, args.chunk_size, use_mmap=not args.stream,
+                                     observe=freqs.feed if freqs else None, locale=args.locale)
+            except (OSError, ValueError) as e:
+                out.write(json.dumps({"file": path, "error": str(e)}) + "\n")
+                failed += 1
+                continue
+            record = {"file": path, **stats.counts()}
+            if freqs is not None:
+                record["frequencies"] = freqs.as_dict()
+            out.write(json.dumps(record) + "\n")
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    if failed:
+        sys.exit(1)
 
 if __name__ == "__main__":
-    root = tk.Tk()
-    app = TextAnalyzerApp(root)
-    root.mainloop()
+    main()
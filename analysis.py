@@ -0,0 +1,505 @@
+import codecs
+import mmap
+import os
+import re
+import sys
+from collections import Counter
+from contextlib import nullcontext
+
+from convert import CONVERSIONS, cluster_start, reverse_graphemes
+
+VOWELS = "aeiou"
+SENTENCE_TERMINATORS = ".!?"
+
+# Lower-case vowels by locale; every other alphabetic character counts as a
+# consonant
+DEFAULT_LOCALE = "en"
+LOCALE_VOWELS = {
+    "en": VOWELS,
+    "de": "aeiouäöü",
+    "es": "aeiouáéíóúü",
+    "fr": "aeiouyàâæéèêëîïôœùûüÿ",
+    "it": "aeiouàèéìíîòóù",
+    "pt": "aeiouáàâãéêíóôõú",
+    "nl": "aeiouyáéíóúäëïöü",
+    "sv": "aeiouyåäö",
+    "fi": "aeiouyäö",
+    "da": "aeiouyæøå",
+    "no": "aeiouyæøå",
+    "pl": "aeiouyąęó",
+    "tr": "aeıioöuü",
+    "ru": "аеёиоуыэюя",
+    "el": "αεηιουωάέήίόύώϊϋΐΰ",
+}
+
+# Text is scanned in windows of this many characters so temporaries stay
+# bounded no matter how large the input is.
+WINDOW_SIZE = 1 << 16
+
+# Bytes read per chunk when streaming a file or stdin
+CHUNK_SIZE = 1 << 20
+
+# One match per sentence: it starts at the first non-blank character after a
+# terminator and runs up to the next terminator.
+_SENTENCE_RE = re.compile(r"[^.!?\s][^.!?]*")
+_TERMINATOR_RE = re.compile(r"[.!?]")
+
+# Byte tables for the ASCII fast path. Mapping every byte to b" " or b"x"
+# turns word and sentence counting into counting b" x" transitions.
+# str.isspace() also treats the \x1c-\x1f separators as whitespace.
+_ASCII_SPACE = b" \t\n\r\x0b\x0c\x1c\x1d\x1e\x1f"
+_WORD_TABLE = bytes(32 if b in _ASCII_SPACE else 120 for b in range(256))
+# Applied after deleting whitespace, so only terminators become spaces
+_SENTENCE_TABLE = bytes(32 if b in SENTENCE_TERMINATORS.encode() else 120 for b in range(256))
+_NON_ALPHA = bytes(b for b in range(256) if not chr(b).isalpha() or b > 127)
+
+_NULL_STAGE = nullcontext()
+
+
+def _no_stage(name):
+    return _NULL_STAGE
+
+
+class AnalysisCancelled(Exception):
+    pass
+
+
+def vowels_and_consonants(char, vowels=VOWELS):
+    # Vowels and consonants are counted on the lower-cased text, and a single
+    # character can lower-case to several (e.g. "İ"), so classify the result.
+    lowered = char.lower()
+    vowel_count = sum(1 for c in lowered if c in vowels)
+    consonants = sum(1 for c in lowered if c.isalpha() and c not in vowels)
+    return vowel_count, consonants
+
+
+class VowelTable:
+    """Vowel/consonant lookup tables for one locale.
+
+    Latin, Greek and Cyrillic characters are classified up front; any other
+    character is classified the first time it is seen.
+    """
+
+    def __init__(self, vowels):
+        self.vowels = vowels
+        # For the ASCII fast path: deleting these bytes leaves the vowels
+        self.non_vowel = bytes(b for b in range(256) if b > 127 or chr(b).lower() not in vowels)
+        self.classes = {chr(cp): vowels_and_consonants(chr(cp), vowels) for cp in range(0x500)}
+
+    def classify(self, char):
+        cls = self.classes.get(char)
+        if cls is None:
+            cls = self.classes[char] = vowels_and_consonants(char, self.vowels)
+        return cls
+
+
+_vowel_tables = {}
+
+
+def vowel_table(locale=None):
+    locale = locale or DEFAULT_LOCALE
+    table = _vowel_tables.get(locale)
+    if table is None:
+        if locale not in LOCALE_VOWELS:
+            raise ValueError(f"Unknown locale {locale!r}; expected one of {', '.join(sorted(LOCALE_VOWELS))}")
+        table = _vowel_tables[locale] = VowelTable(LOCALE_VOWELS[locale])
+    return table
+
+
+class TextStats:
+    """Letter/word/sentence/vowel/consonant counts for a run of text.
+
+    Stats for consecutive pieces of text can be merged, so the text can be
+    fed in windows, chunks or split across workers and still count words and
+    sentences that straddle a boundary exactly once.
+    """
+
+    __slots__ = ("letters", "words", "sentences", "vowels", "consonants",
+                 "starts_in_word", "ends_in_word",
+                 "head_sentence", "tail_sentence", "has_terminator")
+
+    def __init__(self):
+        self.letters = 0
+        self.words = 0
+        self.sentences = 0
+        self.vowels = 0
+        self.consonants = 0
+        # Boundary state used when merging with neighbouring pieces
+        self.starts_in_word = False
+        self.ends_in_word = False
+        self.head_sentence = False
+        self.tail_sentence = False
+        self.has_terminator = False
+
+    @classmethod
+    def of(cls, text, cancel=None, stage=None, observe=None, locale=None):
+        stats = cls()
+        stats.feed(text, cancel, stage, observe, locale)
+        return stats
+
+    def feed(self, text, cancel=None, stage=None, observe=None, locale=None):
+        # cancel is an optional threading.Event checked between windows;
+        # stage(name) is an optional timing context (see instrument.py);
+        # observe(window) is called with each window after it is counted,
+        # so other statistics can be gathered in the same pass; locale picks
+        # the vowels (see LOCALE_VOWELS)
+        for start in range(0, len(text), WINDOW_SIZE):
+            if cancel is not None and cancel.is_set():
+                raise AnalysisCancelled()
+            window = text[start:start + WINDOW_SIZE]
+            self.merge(self._scan(window, stage, locale))
+            if observe is not None:
+                observe(window)
+        return self
+
+    @classmethod
+    def _scan(cls, window, stage=None, locale=None):
+        if window.isascii():
+            return cls._scan_ascii(window.encode("ascii"), stage, locale)
+        stage = stage or _no_stage
+        stats = cls()
+        if not window:
+            return stats
+        stats.letters = len(window)
+        with stage("count.words"):
+            stats.words = len(window.split())
+            stats.starts_in_word = not window[0].isspace()
+            stats.ends_in_word = not window[-1].isspace()
+
+        with stage("count.sentences"):
+            cls._scan_sentences(stats, window)
+
+        with stage("count.vowels_consonants"):
+            classify = vowel_table(locale).classify
+            vowels = consonants = 0
+            for char, n in Counter(window).items():
+                v, c = classify(char)
+                vowels += v * n
+                consonants += c * n
+            stats.vowels = vowels
+            stats.consonants = consonants
+        return stats
+
+    @staticmethod
+    def _scan_sentences(stats, window):
+        first = last = -1
+        count = 0
+        for match in _SENTENCE_RE.finditer(window):
+            if first < 0:
+                first = match.start()
+            last = match.start()
+            count += 1
+        stats.sentences = count
+        term = _TERMINATOR_RE.search(window)
+        last_term = max(window.rfind(t) for t in SENTENCE_TERMINATORS)
+        stats.has_terminator = term is not None
+        stats.head_sentence = count > 0 and (term is None or first < term.start())
+        stats.tail_sentence = count > 0 and last > last_term
+
+    @classmethod
+    def _scan_ascii(cls, window, stage=None, locale=None):
+        # Same counts as _scan() for ASCII bytes, using only C-level
+        # translate/count calls instead of per-character Python code.
+        stage = stage or _no_stage
+        stats = cls()
+        if not window:
+            return stats
+        stats.letters = len(window)
+        with stage("count.words"):
+            words = window.translate(_WORD_TABLE)
+            stats.words = words.count(b" x") + (words[0] == 120)
+            stats.starts_in_word = words[0] == 120
+            stats.ends_in_word = words[-1] == 120
+
+        with stage("count.sentences"):
+            sentences = window.translate(_SENTENCE_TABLE, _ASCII_SPACE)
+            if sentences:
+                stats.sentences = sentences.count(b" x") + (sentences[0] == 120)
+                stats.has_terminator = b" " in sentences
+                stats.head_sentence = sentences[0] == 120
+                stats.tail_sentence = sentences[-1] == 120
+
+        with stage("count.vowels_consonants"):
+            stats.vowels = len(window.translate(None, vowel_table(locale).non_vowel))
+            stats.consonants = len(window.translate(None, _NON_ALPHA)) - stats.vowels
+        return stats
+
+    def merge(self, other):
+        # Append the stats of the text that immediately follows this one
+        if not other.letters:
+            return self
+        if not self.letters:
+            for name in self.__slots__:
+                setattr(self, name, getattr(other, name))
+            return self
+        self.words += other.words - (self.ends_in_word and other.starts_in_word)
+        self.sentences += other.sentences - (self.tail_sentence and other.head_sentence)
+        self.letters += other.letters
+        self.vowels += other.vowels
+        self.consonants += other.consonants
+        self.ends_in_word = other.ends_in_word
+        if not self.has_terminator:
+            self.head_sentence = self.head_sentence or other.head_sentence
+        if not other.has_terminator:
+            self.tail_sentence = self.tail_sentence or other.tail_sentence
+        else:
+            self.tail_sentence = other.tail_sentence
+        self.has_terminator = self.has_terminator or other.has_terminator
+        return self
+
+    def counts(self):
+        return {
+            "letters": self.letters,
+            "words": self.words,
+            "sentences": self.sentences,
+            "vowels": self.vowels,
+            "consonants": self.consonants,
+        }
+
+    def state(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    @classmethod
+    def from_state(cls, state):
+        stats = cls()
+        for name in cls.__slots__:
+            setattr(stats, name, state[name])
+        return stats
+
+    def __repr__(self):
+        fields = ", ".join(f"{k}={v}" for k, v in self.counts().items())
+        return f"TextStats({fields})"
+
+
+def _word_start(text, pos, reach=64):
+    # Move pos back to the start of the word it falls in, looking at most
+    # `reach` characters back
+    if pos <= 0 or pos >= len(text):
+        return max(0, min(pos, len(text)))
+    for i in range(pos, max(pos - reach, 0), -1):
+        if text[i - 1].isspace():
+            return i
+    return 0 if pos <= reach else pos
+
+
+def _word_end(text, pos, reach=64):
+    # Move pos forward to the end of the word it falls in
+    if pos <= 0 or pos >= len(text):
+        return max(0, min(pos, len(text)))
+    for i in range(pos, min(pos + reach, len(text))):
+        if text[i].isspace():
+            return i
+    return len(text) if pos + reach >= len(text) else pos
+
+
+def render_window(text, name, start, end):
+    # Conversion `name` ("original" or a key of CONVERSIONS) of the text in
+    # [start, end), converting only that part, so consecutive windows join
+    # up exactly. Case conversions see the whole words around the window for
+    # context and are then cut back to it; how long a character's mapping is
+    # only depends on what precedes it in its word, so converting the
+    # leading parts of the word-aligned chunk gives the cut points.
+    # Offsets of "reversed" count from the end of the text and are moved to
+    # grapheme cluster boundaries.
+    if name == "reversed":
+        n = len(text)
+        return reverse_graphemes(text[cluster_start(text, max(n - end, 0)):cluster_start(text, max(n - start, 0))])
+    if name == "original":
+        return text[start:end]
+    convert = CONVERSIONS[name]
+    chunk_start = _word_start(text, start)
+    converted = convert(text[chunk_start:_word_end(text, end)])
+    head = len(convert(text[chunk_start:start])) if start > chunk_start else 0
+    return converted[head:len(convert(text[chunk_start:end]))]
+
+
+class AnalysisResult:
+    """Counts for a text plus its conversions, computed on first access."""
+
+    __slots__ = ("text", "stats", "frequencies", "on_grow", "_converted")
+
+    def __init__(self, text, stats, frequencies=None):
+        self.text = text
+        self.stats = stats
+        self.frequencies = frequencies  # optional WordFrequencies (see frequency.py)
+        self.on_grow = None  # called with the result after each new conversion
+        self._converted = {}
+
+    def convert(self, name):
+        value = self._converted.get(name)
+        if value is None:
+            value = self._converted[name] = CONVERSIONS[name](self.text)
+            if self.on_grow is not None:
+                self.on_grow(self)
+        return value
+
+    lower = property(lambda self: self.convert("lower"))
+    upper = property(lambda self: self.convert("upper"))
+    title = property(lambda self: self.convert("title"))
+    reversed = property(lambda self: self.convert("reversed"))
+
+    letters = property(lambda self: self.stats.letters)
+    words = property(lambda self: self.stats.words)
+    sentences = property(lambda self: self.stats.sentences)
+    vowels = property(lambda self: self.stats.vowels)
+    consonants = property(lambda self: self.stats.consonants)
+
+    def memory_size(self):
+        # Approximate memory held by the text and the conversions made so far
+        return sys.getsizeof(self.text) + sum(sys.getsizeof(v) for v in self._converted.values())
+
+    def as_dict(self, conversions=CONVERSIONS):
+        # Only the named conversions are computed
+        data = {"original": self.text}
+        for name in conversions:
+            data[name] = self.convert(name)
+        data.update(self.stats.counts())
+        return data
+
+
+def analyze(text, cancel=None, stage=None, locale=None):
+    return AnalysisResult(text, TextStats.of(text, cancel, stage, locale=locale))
+
+
+class IncrementalAnalyzer:
+    """Re-analyses successive versions of a text, re-scanning only the part
+    that changed.
+
+    The text is kept as blocks of about WINDOW_SIZE characters with their
+    TextStats. Blocks before and after an edit are reused, the edited region
+    is re-scanned, and the totals are re-merged from the block stats, so
+    words and sentences at the edges of the edit are joined correctly.
+
+    Given an observe callback, update() re-scans every block and passes
+    each one's text to observe in order, so other statistics (e.g. word
+    frequencies) are gathered in the same pass as the counts.
+    """
+
+    def __init__(self, block_size=WINDOW_SIZE, locale=None):
+        self.block_size = block_size
+        self.locale = locale or DEFAULT_LOCALE
+        self.text = ""
+        self.blocks = []  # (start, end, TextStats) covering self.text
+        self.stats = TextStats()
+        self.rescanned = 0
+
+    def _common_blocks(self, text):
+        # Leading blocks whose text is unchanged at the same offset, then
+        # trailing blocks unchanged at the same distance from the end
+        old = self.text
+        head = 0
+        for start, end, _ in self.blocks:
+            if end > len(text) or not text.startswith(old[start:end], start):
+                break
+            head += 1
+        shift = len(text) - len(old)
+        tail = len(self.blocks)
+        limit = self.blocks[head - 1][1] if head else 0
+        while tail > head:
+            start, end, _ = self.blocks[tail - 1]
+            if start + shift < limit or not text.startswith(old[start:end], start + shift):
+                break
+            tail -= 1
+        return head, tail, shift
+
+    def update(self, text, cancel=None, stage=None, observe=None):
+        if text == self.text and observe is None:
+            self.rescanned = 0
+            return self.stats
+        if observe is None:
+            head, tail, shift = self._common_blocks(text)
+        else:
+            head, tail, shift = 0, len(self.blocks), len(text) - len(self.text)
+        # Fold short neighbouring blocks into the re-scan so repeated small
+        # edits do not fragment the text into tiny blocks
+        blocks = self.blocks
+        if head and blocks[head - 1][1] - blocks[head - 1][0] < self.block_size:
+            head -= 1
+        if tail < len(blocks) and blocks[tail][1] - blocks[tail][0] < self.block_size:
+            tail += 1
+        region_start = blocks[head - 1][1] if head else 0
+        region_end = (blocks[tail][0] if tail < len(blocks) else len(self.text)) + shift
+
+        middle = []
+        for start in range(region_start, region_end, self.block_size):
+            if cancel is not None and cancel.is_set():
+                raise AnalysisCancelled()
+            end = min(start + self.block_size, region_end)
+            block = text[start:end]
+            middle.append((start, end, TextStats._scan(block, stage, self.locale)))
+            if observe is not None:
+                observe(block)
+        suffix = [(start + shift, end + shift, stats) for start, end, stats in blocks[tail:]]
+
+        self.blocks = blocks[:head] + middle + suffix
+        self.text = text
+        self.rescanned = region_end - region_start
+        self.stats = TextStats()
+        for _, _, stats in self.blocks:
+            self.stats.merge(stats)
+        return self.stats
+
+    def analyze(self, text, cancel=None, stage=None, observe=None):
+        return AnalysisResult(text, self.update(text, cancel, stage, observe))
+
+
+def analyze_stream(stream, chunk_size=CHUNK_SIZE, encoding="utf-8", errors="replace", observe=None, locale=None):
+    # Read a binary stream chunk by chunk in constant memory. The incremental
+    # decoder holds back a multibyte sequence cut at a chunk boundary, and
+    # TextStats joins words and sentences split across chunks.
+    decoder = codecs.getincrementaldecoder(encoding)(errors)
+    stats = TextStats()
+    while True:
+        data = stream.read(chunk_size)
+        if not data:
+            break
+        stats.feed(decoder.decode(data), observe=observe, locale=locale)
+    stats.feed(decoder.decode(b"", final=True), observe=observe, locale=locale)
+    return stats
+
+
+def analyze_buffer(buf, start=0, end=None, chunk_size=CHUNK_SIZE,
+                   encoding="utf-8", errors="replace", observe=None, locale=None):
+    # Scan a bytes-like object (usually an mmap) window by window. ASCII
+    # windows are counted directly on the bytes; only windows containing
+    # non-ASCII data, or following a multibyte sequence cut at the previous
+    # window's end, are decoded to str (ASCII ones too when observed).
+    if end is None:
+        end = len(buf)
+    decoder = codecs.getincrementaldecoder(encoding)(errors)
+    stats = TextStats()
+    for pos in range(start, end, chunk_size):
+        window = buf[pos:min(pos + chunk_size, end)]
+        if window.isascii() and not decoder.getstate()[0]:
+            stats.merge(TextStats._scan_ascii(window, locale=locale))
+            if observe is not None:
+                observe(window.decode("ascii"))
+        else:
+            stats.feed(decoder.decode(window), observe=observe, locale=locale)
+    stats.feed(decoder.decode(b"", final=True), observe=observe, locale=locale)
+    return stats
+
+
+def analyze_mmap(path, start=0, end=None, chunk_size=CHUNK_SIZE,
+                 encoding="utf-8", errors="replace", observe=None, locale=None):
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if end is None or end > size:
+            end = size
+        if start >= end:
+            return TextStats()
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            return analyze_buffer(mm, start, end, chunk_size, encoding, errors, observe, locale)
+
+
+def analyze_file(path, chunk_size=CHUNK_SIZE, encoding="utf-8", errors="replace",
+                 use_mmap=True, observe=None, locale=None):
+    # Regular files are memory-mapped; stdin, pipes and other streams are read
+    # in chunks.
+    if path == "-":
+        return analyze_stream(sys.stdin.buffer, chunk_size, encoding, errors, observe, locale)
+    if use_mmap and os.path.isfile(path):
+        return analyze_mmap(path, chunk_size=chunk_size, encoding=encoding, errors=errors,
+                            observe=observe, locale=locale)
+    with open(path, "rb") as f:
+        return analyze_stream(f, chunk_size, encoding, errors, observe, locale)
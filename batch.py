@@ -0,0 +1,123 @@
+import glob
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+from analysis import CHUNK_SIZE, TextStats, analyze_mmap
+from frequency import WordFrequencies
+
+# Files larger than this are split into pieces analysed by separate workers
+SPLIT_SIZE = 64 << 20
+
+
+def find_files(pattern):
+    if os.path.isdir(pattern):
+        for dirpath, dirnames, filenames in os.walk(pattern):
+            dirnames.sort()
+            for name in sorted(filenames):
+                yield os.path.join(dirpath, name)
+    else:
+        for path in sorted(glob.glob(pattern, recursive=True)):
+            if os.path.isfile(path):
+                yield path
+
+
+def split_points(path, size, split_size=SPLIT_SIZE):
+    # Byte offsets splitting a file into pieces of about split_size. Each
+    # offset is moved forward past UTF-8 continuation bytes so no character
+    # is cut in half; words and sentences cut at a split are rejoined when
+    # the pieces' TextStats are merged.
+    points = [0]
+    with open(path, "rb") as f:
+        for offset in range(split_size, size, split_size):
+            f.seek(offset)
+            head = f.read(4)
+            skip = 0
+            while skip < len(head) and head[skip] & 0xC0 == 0x80:
+                skip += 1
+            if offset + skip > points[-1]:
+                points.append(offset + skip)
+    points.append(size)
+    return points
+
+
+def plan_pieces(paths, chunk_size=CHUNK_SIZE, split_size=SPLIT_SIZE):
+    for path in paths:
+        try:
+            points = split_points(path, os.path.getsize(path), split_size)
+        except OSError as e:
+            yield (path, 0, 0, chunk_size, str(e))
+            continue
+        for start, end in zip(points, points[1:]):
+            yield (path, start, end, chunk_size, None)
+
+
+def _analyze_piece(piece, frequencies=False, locale=None):
+    # Word frequencies, when asked for, are gathered in the same pass
+    path, start, end, chunk_size, error = piece
+    if error is None:
+        try:
+            freqs = WordFrequencies() if frequencies else None
+            stats = analyze_mmap(path, start, end, chunk_size, observe=freqs.feed if freqs else None, locale=locale)
+            return path, stats, freqs, None
+        except (OSError, ValueError) as e:
+            error = str(e)
+    return path, None, None, error
+
+
+def _record(path, stats, freqs, error):
+    if error is not None:
+        return {"file": path, "error": error}
+    record = {"file": path, **stats.counts()}
+    if freqs is not None:
+        record["frequencies"] = freqs.as_dict()
+    return record
+
+
+def _analyze_files(paths, workers, chunk_size, split_size, batch_size, frequencies, locale):
+    # (path, stats, freqs, error) per file, in order. Pieces of a file come
+    # back from executor.map in order, so they are merged as they arrive.
+    current = stats = freqs = error = None
+    analyze_piece = partial(_analyze_piece, frequencies=frequencies, locale=locale)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pieces = plan_pieces(paths, chunk_size, split_size)
+        for path, piece_stats, piece_freqs, piece_error in executor.map(analyze_piece, pieces, chunksize=batch_size):
+            if path != current:
+                if current is not None:
+                    yield current, stats, freqs, error
+                current, stats, error = path, TextStats(), None
+                freqs = WordFrequencies() if frequencies else None
+            if error is None:
+                if piece_error is None:
+                    stats.merge(piece_stats)
+                    if freqs is not None:
+                        freqs.merge(piece_freqs)
+                else:
+                    error = piece_error
+        if current is not None:
+            yield current, stats, freqs, error
+
+
+def batch_records(paths, workers=None, chunk_size=CHUNK_SIZE, split_size=SPLIT_SIZE, batch_size=16,
+                  frequencies=False, locale=None):
+    # Per-file records followed by one aggregate record summing the counts of
+    # every file that was read successfully (and merging their frequencies)
+    totals = dict.fromkeys(TextStats().counts(), 0)
+    total_freqs = WordFrequencies() if frequencies else None
+    files = failed = 0
+    for path, stats, freqs, error in _analyze_files(paths, workers, chunk_size, split_size, batch_size,
+                                                    frequencies, locale):
+        record = _record(path, stats, freqs, error)
+        if "error" in record:
+            failed += 1
+        else:
+            files += 1
+            for key in totals:
+                totals[key] += record[key]
+            if total_freqs is not None:
+                total_freqs.merge(freqs, adjacent=False)
+        yield record
+    aggregate = {"aggregate": True, "files": files, "failed": failed, **totals}
+    if total_freqs is not None:
+        aggregate["frequencies"] = total_freqs.as_dict()
+    yield aggregate
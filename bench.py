@@ -0,0 +1,221 @@
+"""Headless benchmarks for the analysis, conversion and persistence paths.
+
+    python bench.py --sizes 1KB,1MB,64MB --save-baseline bench_baseline.json
+    python bench.py --baseline bench_baseline.json --threshold 0.25
+
+Each corpus/size case runs in a fresh worker process. A stage's peak is the
+most memory Python allocated during one extra, untimed run under tracemalloc
+(file pages mapped by mmap and SQLite's own cache are not counted). Exits with
+status 1 when any stage is slower than the baseline by more than the threshold
+and by more than --floor seconds.
+"""
+import argparse
+import itertools
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy_backend
+from analysis import CONVERSIONS, TextStats, analyze_mmap
+from store import EntryStore
+
+CORPORA = ("ascii", "unicode", "long_lines", "short_lines")
+DEFAULT_SIZES = "1KB,1MB,16MB"
+UNITS = {"KB": 1 << 10, "MB": 1 << 20, "GB": 1 << 30}
+
+_ASCII_WORDS = ("the", "quick", "brown", "fox", "jumps", "over", "lazy", "dog",
+                "analysis", "of", "text", "is", "fun", "Hello", "World")
+_UNICODE_WORDS = _ASCII_WORDS + ("naïve", "café", "Straße", "ΣΟΦΙΑ", "İstanbul", "東京",
+                                 "привет", "emoji😀", "école", "👍🏽")
+
+
+def parse_size(text):
+    text = text.strip().upper()
+    for unit, factor in UNITS.items():
+        if text.endswith(unit):
+            return int(float(text[:-len(unit)]) * factor)
+    return int(text)
+
+
+def format_size(size):
+    for unit, factor in reversed(UNITS.items()):
+        if size >= factor and size % factor == 0:
+            return f"{size // factor}{unit}"
+    return str(size)
+
+
+def make_corpus(kind, size, seed=0):
+    # Deterministic synthetic text of `size` characters. A 64 KB block is
+    # generated and repeated so large sizes are quick to build.
+    rng = random.Random(seed)
+    words = _UNICODE_WORDS if kind == "unicode" else _ASCII_WORDS
+    parts = []
+    length = 0
+    block = min(size, 1 << 16)
+    while length < block:
+        sentence = " ".join(rng.choice(words) for _ in range(rng.randint(3, 15)))
+        sentence = sentence + rng.choice(".!?")
+        if kind == "short_lines":
+            sentence += "\n"
+        elif kind == "long_lines" or rng.random() < 0.9:
+            sentence += " "
+        else:
+            sentence += "\n"
+        parts.append(sentence)
+        length += len(sentence)
+    unit = "".join(parts)
+    # join sizes the result first, so no oversized copy is built and sliced
+    count, rest = divmod(size, len(unit))
+    return "".join(itertools.chain(itertools.repeat(unit, count), [unit[:rest]]))
+
+
+def _peak_mb(func):
+    # Most memory traced while func runs, above what was allocated before
+    tracemalloc.start()
+    try:
+        func()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return round(peak / (1 << 20), 1)
+
+
+def _best_of(repeat, func):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def _history_entries(text):
+    # Up to 100 entries of at most 4 KB spread over the corpus
+    step = max(len(text) // 100, 1)
+    return [text[i:i + 4096] for i in range(0, len(text), step)][:100]
+
+
+def _persistence(entries, path):
+    # History/favorites traffic: add entries, re-add duplicates, list them
+    store = EntryStore(path)
+    store.set_retention("history", 50)
+    for entry in entries + entries:
+        store.add("history", entry, TextStats())
+    store.texts("history")
+    store.close()
+
+
+def run_case(kind, size, repeat):
+    text = make_corpus(kind, size)
+    nbytes = len(text.encode("utf-8", "surrogatepass"))
+    stages = {"counts": lambda: TextStats.of(text)}
+    if numpy_backend.available():
+        stages["counts_numpy"] = lambda: numpy_backend.count_batch([text])
+    for name, convert in CONVERSIONS.items():
+        stages[f"convert_{name}"] = lambda c=convert: c(text)
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "corpus.txt")
+        with open(path, "w", encoding="utf-8", errors="surrogatepass") as f:
+            f.write(text)
+        stages["counts_mmap"] = lambda: analyze_mmap(path)
+        entries = _history_entries(text)
+        runs = itertools.count()
+        stages["persistence"] = lambda: _persistence(entries, os.path.join(tmp, f"store{next(runs)}.sqlite3"))
+        for stage, func in stages.items():
+            seconds = _best_of(repeat, func)
+            results.append((stage, seconds, _peak_mb(func)))
+
+    entry_bytes = 2 * sum(len(entry.encode("utf-8", "surrogatepass")) for entry in entries)
+    rows = []
+    for stage, seconds, peak in results:
+        stage_bytes = entry_bytes if stage == "persistence" else nbytes
+        rows.append({
+            "corpus": kind,
+            "size": format_size(size),
+            "stage": stage,
+            "seconds": round(seconds, 6),
+            "mb_per_s": round(stage_bytes / (1 << 20) / seconds, 2) if seconds else None,
+            "peak_mb": peak,
+        })
+    return rows
+
+
+def case_key(row):
+    return f"{row['corpus']}/{row['size']}/{row['stage']}"
+
+
+def compare(rows, baseline, threshold, floor=0.0):
+    # Stages slower than the baseline by more than `threshold` (0.2 = 20%)
+    # and by more than `floor` seconds, so microsecond stages on small
+    # corpora are not flagged for timer noise
+    regressions = []
+    for row in rows:
+        old = baseline.get(case_key(row))
+        if (old and row["seconds"] > old["seconds"] * (1 + threshold)
+                and row["seconds"] - old["seconds"] > floor):
+            regressions.append((row, old))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the Text Analyzer hot paths")
+    parser.add_argument("--corpora", default=",".join(CORPORA),
+                        help="comma-separated corpus kinds: " + ", ".join(CORPORA))
+    parser.add_argument("--sizes", default=DEFAULT_SIZES,
+                        help="comma-separated sizes, e.g. 1KB,1MB,1GB (default: %(default)s)")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per stage; the best is kept")
+    parser.add_argument("--baseline", help="JSON baseline to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="allowed slowdown against the baseline (default: %(default)s)")
+    parser.add_argument("--floor", type=float, default=0.005,
+                        help="ignore slowdowns of fewer seconds than this (default: %(default)s)")
+    parser.add_argument("--save-baseline", metavar="PATH", help="write these results as a baseline")
+    parser.add_argument("--json", action="store_true", help="print results as JSON lines")
+    args = parser.parse_args(argv)
+
+    kinds = [k.strip() for k in args.corpora.split(",") if k.strip()]
+    unknown = set(kinds) - set(CORPORA)
+    if unknown:
+        parser.error(f"unknown corpus: {', '.join(sorted(unknown))}")
+    sizes = [parse_size(s) for s in args.sizes.split(",") if s.strip()]
+
+    rows = []
+    for kind in kinds:
+        for size in sizes:
+            with ProcessPoolExecutor(max_workers=1) as executor:
+                case_rows = executor.submit(run_case, kind, size, args.repeat).result()
+            rows.extend(case_rows)
+            for row in case_rows:
+                if args.json:
+                    print(json.dumps(row))
+                else:
+                    print(f"{case_key(row):<40} {row['seconds']:>10.4f}s {row['mb_per_s'] or 0:>10.1f} MB/s"
+                          f" {row['peak_mb']:>8.1f} MB peak")
+            sys.stdout.flush()
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump({case_key(row): row for row in rows}, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(rows, baseline, args.threshold, args.floor)
+        for row, old in regressions:
+            print(f"REGRESSION {case_key(row)}: {row['seconds']:.4f}s vs baseline {old['seconds']:.4f}s",
+                  file=sys.stderr)
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,133 @@
+import functools
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+from analysis import AnalysisResult, TextStats
+
+
+def content_digest(text):
+    return hashlib.blake2b(text.encode("utf-8", "surrogatepass"), digest_size=16).hexdigest()
+
+
+class ResultCache:
+    """Bounded LRU cache of analysis results keyed by content digest.
+
+    Entries are evicted once either max_entries or max_bytes is exceeded.
+    A cached result is re-measured whenever it computes another conversion.
+    Only the counts are persisted to disk; a result loaded from disk gets its
+    text back from the caller and recomputes conversions on demand.
+    """
+
+    def __init__(self, max_entries=256, max_bytes=64 << 20, path=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.path = path
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()  # digest -> (AnalysisResult or TextStats, size)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, text, key=None):
+        key = key or content_digest(text)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(key)
+            value, size = entry
+        if isinstance(value, TextStats):
+            value = AnalysisResult(text, value)
+            self.put(text, value, key)
+        return value
+
+    def put(self, text, result, key=None):
+        key = key or content_digest(text)
+        size = result.memory_size()
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.bytes -= old[1]
+            if size > self.max_bytes:
+                return
+            self._entries[key] = (result, size)
+            self.bytes += size
+            result.on_grow = functools.partial(self._resize, key)
+            self._evict()
+
+    def _resize(self, key, result):
+        size = result.memory_size()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] is not result:
+                return
+            self.bytes += size - entry[1]
+            if size > self.max_bytes:
+                del self._entries[key]
+                self.bytes -= size
+                self.evictions += 1
+                return
+            self._entries[key] = (result, size)
+            self._evict()
+
+    def _evict(self):
+        # Drop least recently used entries until both limits hold
+        while len(self._entries) > self.max_entries or self.bytes > self.max_bytes:
+            _, (_, evicted) = self._entries.popitem(last=False)
+            self.bytes -= evicted
+            self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def stats(self):
+        return {
+            "entries": len(self._entries),
+            "bytes": self.bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+    def load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r") as f:
+                saved = json.load(f)
+        except (OSError, ValueError) as e:
+            print("Error loading cache:", e)
+            return
+        with self._lock:
+            for key, state in reversed(list(saved.items())):
+                if key not in self._entries:
+                    # Older than anything cached this session
+                    self._entries[key] = (TextStats.from_state(state), 0)
+                    self._entries.move_to_end(key, last=False)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def save(self):
+        if not self.path:
+            return
+        with self._lock:
+            saved = {}
+            for key, (value, _) in self._entries.items():
+                stats = value if isinstance(value, TextStats) else value.stats
+                saved[key] = stats.state()
+        try:
+            with open(self.path, "w") as f:
+                json.dump(saved, f)
+        except OSError as e:
+            print("Error saving cache:", e)
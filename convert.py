@@ -0,0 +1,275 @@
+import itertools
+import mmap
+import os
+import re
+import stat
+import unicodedata
+
+# Conversions yield text in chunks of about this many characters, so a copy
+# or save of a multi-megabyte text never builds the whole output at once.
+CHUNK_CHARS = 1 << 16
+
+# Characters either side of a chunk that a case conversion looks at, and the
+# furthest a chunk is extended to end at whitespace
+_CONTEXT = 64
+
+# A grapheme cluster is what a reader sees as one character: a base plus
+# combining marks, an emoji with skin-tone modifiers or ZWJ-joined emoji, a
+# flag (two regional indicators) or CRLF. The Extend table is built from
+# unicodedata the first time non-ASCII text is reversed.
+_ZWJ = "\u200d"
+_REGIONAL = "\U0001F1E6-\U0001F1FF"
+# Extended_Pictographic (UCD emoji-data), the characters a ZWJ joins on to
+# its cluster (GB11); a ZWJ before anything else only extends what precedes it
+_PICTOGRAPHIC = (
+    "\u00a9\u00ae\u203c\u2049\u2122\u2139\u2194-\u2199\u21a9\u21aa\u231a\u231b\u2328\u2388\u23cf"
+    "\u23e9-\u23f3\u23f8-\u23fa\u24c2\u25aa\u25ab\u25b6\u25c0\u25fb-\u25fe\u2600-\u2605"
+    "\u2607-\u2612\u2614-\u2685\u2690-\u2705\u2708-\u2712\u2714\u2716\u271d\u2721\u2728"
+    "\u2733\u2734\u2744\u2747\u274c\u274e\u2753-\u2755\u2757\u2763-\u2767\u2795-\u2797"
+    "\u27a1\u27b0\u27bf\u2934\u2935\u2b05-\u2b07\u2b1b\u2b1c\u2b50\u2b55\u3030\u303d\u3297\u3299"
+    "\U0001f000-\U0001f0ff\U0001f10d-\U0001f10f\U0001f12f\U0001f16c-\U0001f171\U0001f17e\U0001f17f"
+    "\U0001f18e\U0001f191-\U0001f19a\U0001f1ad-\U0001f1e5\U0001f201-\U0001f20f\U0001f21a\U0001f22f"
+    "\U0001f232-\U0001f23a\U0001f23c-\U0001f23f\U0001f249-\U0001f3fa\U0001f400-\U0001f53d"
+    "\U0001f546-\U0001f64f\U0001f680-\U0001f6ff\U0001f774-\U0001f77f\U0001f7d5-\U0001f7ff"
+    "\U0001f80c-\U0001f80f\U0001f848-\U0001f84f\U0001f85a-\U0001f85f\U0001f888-\U0001f88f"
+    "\U0001f8ae-\U0001f8ff\U0001f90c-\U0001f93a\U0001f93c-\U0001f945\U0001f947-\U0001faff"
+    "\U0001fc00-\U0001fffd"
+)
+_EXTRA_EXTEND = (
+    (0x200C, 0x200C),  # zero width non-joiner
+    (0x1160, 0x11FF),  # Hangul medial vowels and final consonants
+    (0xD7B0, 0xD7FF),
+    (0x1F3FB, 0x1F3FF),  # emoji skin-tone modifiers
+    (0xE0020, 0xE007F),  # emoji tag sequences
+)
+_extend = None
+_run_re = None
+
+
+def _extend_classes():
+    # Character-class bodies of every combining mark (Mn, Me, Mc) plus the
+    # extras above, split at U+FFFF: re checks a class of BMP characters with
+    # one table lookup, but a class with astral ranges range by range. Marks
+    # only occur below U+20000 and in plane 14.
+    global _extend
+    if _extend is None:
+        ranges = list(_EXTRA_EXTEND)
+        for cp in itertools.chain(range(0x300, 0x20000), range(0xE0100, 0xE01F0)):
+            if unicodedata.category(chr(cp))[0] == "M":
+                if ranges[-1][1] == cp - 1:
+                    ranges[-1] = (ranges[-1][0], cp)
+                else:
+                    ranges.append((cp, cp))
+        ranges.sort()
+        _extend = tuple("".join(f"\\U{a:08x}-\\U{b:08x}" for a, b in ranges if (a > 0xFFFF) == astral)
+                        for astral in (False, True))
+    return _extend
+
+
+def _get_run_re():
+    # Matches the multi-character clusters: CRLF and flags whole, and runs
+    # of marks/ZWJ sequences that extend the character before them. The
+    # lookahead is a cheap first test that skips ordinary characters.
+    global _run_re
+    if _run_re is None:
+        bmp, astral = _extend_classes()
+        _run_re = re.compile(rf"(?=[\r{bmp}{_ZWJ}\U00010000-\U0010ffff])"
+                             rf"(?:(\r\n|[{_REGIONAL}]{{2}})|(?:[{bmp}]|[{astral}]|{_ZWJ}[{_PICTOGRAPHIC}]?)+)")
+    return _run_re
+
+
+def cluster_spans(text):
+    # (start, end) of every grapheme cluster longer than one code point, in
+    # order; every other code point is a cluster on its own
+    spans = []
+    for match in _get_run_re().finditer(text):
+        start, end = match.span()
+        if match.group(1) is None and start and text[start - 1] not in "\r\n":
+            start -= 1  # the base the marks attach to
+        if spans and spans[-1][1] > start:
+            spans[-1] = (spans[-1][0], end)
+        else:
+            spans.append((start, end))
+    return spans
+
+
+def reverse_graphemes(text):
+    # Reverse the order of grapheme clusters, keeping each cluster intact.
+    # Multi-character clusters are pre-reversed in place, so one code point
+    # reversal of the whole text puts them back the right way round.
+    if text.isascii():
+        reversed_text = text[::-1]
+        return reversed_text.replace("\n\r", "\r\n") if "\r" in text else reversed_text
+    spans = cluster_spans(text)
+    if not spans:
+        return text[::-1]
+    pieces = []
+    pos = 0
+    for start, end in spans:
+        pieces.append(text[pos:start])
+        pieces.append(text[start:end][::-1])
+        pos = end
+    pieces.append(text[pos:])
+    return "".join(pieces)[::-1]
+
+
+def cluster_start(text, pos, reach=64):
+    # Move pos back to the start of the grapheme cluster it falls in,
+    # looking at most `reach` characters back
+    if pos <= 0 or pos >= len(text) or text[pos - 1:pos + 1].isascii() and text[pos - 1:pos + 1] != "\r\n":
+        return max(0, min(pos, len(text)))
+    low = max(pos - reach, 0)
+    for start, end in cluster_spans(text[low:pos + reach]):
+        if low + start < pos < low + end:
+            return low + start
+    return pos
+
+
+_SPACE_RE = re.compile(r"\s")
+
+
+def _word_cut(text, pos, reach=_CONTEXT):
+    # First whitespace at or after pos, looking at most `reach` characters
+    # on; pos itself when there is none (e.g. CJK text)
+    match = _SPACE_RE.search(text, pos, pos + reach)
+    if match:
+        return match.start()
+    return len(text) if pos + reach >= len(text) else pos
+
+
+def _is_break(text, pos):
+    # Case mappings only look at the neighbouring letters of a word (final
+    # sigma, title case), so a chunk cut next to whitespace converts the
+    # same as it does within the whole text
+    return pos <= 0 or pos >= len(text) or text[pos].isspace() or text[pos - 1].isspace()
+
+
+def _convert_in_context(convert, text, start, end, reach=_CONTEXT):
+    # convert(text[start:end]) as it comes out within the whole text: up to
+    # `reach` characters either side are converted with it and cut off
+    # again. The cuts are found by converting shorter pieces that begin at
+    # the same place, since how long a character's mapping is depends only
+    # on what precedes it.
+    low, high = max(start - reach, 0), min(end + reach, len(text))
+    converted = convert(text[low:high])
+    head = len(convert(text[low:start])) if start > low else 0
+    tail = 0
+    if high > end:
+        mid = max(end - reach, start)
+        tail = len(convert(text[mid:high])) - len(convert(text[mid:end]))
+    return converted[head:len(converted) - tail]
+
+
+CONVERSIONS = {
+    "lower": str.lower,
+    "upper": str.upper,
+    "title": str.title,
+    "reversed": reverse_graphemes,
+}
+
+TITLES = {
+    "original": "Original",
+    "lower": "Lower Case",
+    "upper": "Upper Case",
+    "title": "Title Case",
+    "reversed": "Reversed",
+}
+
+
+def iter_conversion(text, name, chunk_size=CHUNK_CHARS):
+    # Conversion `name` ("original" or a key of CONVERSIONS) of text, one
+    # chunk at a time. Only this conversion is computed.
+    if name == "reversed":
+        end = len(text)
+        while end > 0:
+            start = cluster_start(text, max(end - chunk_size, 0))
+            yield reverse_graphemes(text[start:end])
+            end = start
+        return
+    convert = CONVERSIONS.get(name)
+    if convert is None and name != "original":
+        raise KeyError(name)
+    start = 0
+    while start < len(text):
+        end = _word_cut(text, min(start + chunk_size, len(text)))
+        if convert is None:
+            yield text[start:end]
+        elif _is_break(text, start) and _is_break(text, end):
+            yield convert(text[start:end])
+        else:
+            yield _convert_in_context(convert, text, start, end)
+        start = end
+
+
+def iter_stream_conversion(read, name, chunk_size=CHUNK_CHARS):
+    # Like iter_conversion, for text read piece by piece with read(size).
+    # Each chunk is converted once the next _CONTEXT characters are known.
+    if name == "reversed":
+        raise ValueError("the reversed conversion needs the whole text")
+    convert = CONVERSIONS.get(name)
+    if convert is None and name != "original":
+        raise KeyError(name)
+    context = pending = ""
+    while True:
+        block = read(chunk_size)
+        pending += block
+        end = len(pending) - _CONTEXT if block else len(pending)
+        if end > 0:
+            if convert is None:
+                yield pending[:end]
+            else:
+                text = context + pending
+                yield _convert_in_context(convert, text, len(context), len(context) + end)
+            context = (context + pending[:end])[-_CONTEXT:]
+            pending = pending[end:]
+        if not block:
+            return
+
+
+def iter_reversed_bytes(buf, chunk_size=CHUNK_CHARS, errors="replace"):
+    # Reversal of UTF-8 data (e.g. an mmap of a file), decoded from the end
+    # one chunk at a time. The first characters of each chunk are held back
+    # until the chunk before it is read, in case a cluster straddles the cut.
+    end = len(buf)
+    carry = ""
+    while end > 0:
+        start = max(end - chunk_size, 0)
+        while start > 0 and buf[start] & 0xC0 == 0x80:
+            start -= 1  # a continuation byte: back to the start of the character
+        text = bytes(buf[start:end]).decode("utf-8", errors) + carry
+        end = start
+        if not end:
+            yield reverse_graphemes(text)
+            return
+        cut = cluster_start(text, min(_CONTEXT, len(text)))
+        if cut:
+            yield reverse_graphemes(text[cut:])
+        carry = text[:cut] if cut else text
+
+
+def iter_file_conversion(path, name, chunk_size=CHUNK_CHARS):
+    # Like iter_conversion for a UTF-8 file, read chunk by chunk. Reversal
+    # reads a regular file backwards through an mmap; other files (pipes,
+    # devices) are read whole for it.
+    if name != "reversed":
+        with open(path, encoding="utf-8", errors="replace", newline="") as f:
+            yield from iter_stream_conversion(f.read, name, chunk_size)
+        return
+    with open(path, "rb") as f:
+        info = os.fstat(f.fileno())
+        if not stat.S_ISREG(info.st_mode):
+            yield from iter_conversion(f.read().decode("utf-8", "replace"), name, chunk_size)
+        elif info.st_size:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                yield from iter_reversed_bytes(mm, chunk_size)
+
+
+def write_conversions(text, names, write, chunk_size=CHUNK_CHARS, chunks=iter_conversion):
+    # Write the requested conversions as "Title: text" lines through
+    # write(str), chunk by chunk. With chunks=iter_file_conversion, `text`
+    # is the path of a file to convert.
+    for name in names:
+        write(f"{TITLES[name]}: ")
+        for chunk in chunks(text, name, chunk_size):
+            write(chunk)
+        write("\n")
@@ -0,0 +1,446 @@
+import hashlib
+import heapq
+import math
+import re
+from array import array
+from collections import Counter
+
+from analysis import WINDOW_SIZE, AnalysisCancelled, _no_stage
+
+DEFAULT_TOP_K = 20
+WORD_NGRAM = 2
+CHAR_NGRAM = 3
+
+# Each table counts exactly until it holds this many distinct keys; after
+# that the exact counts are folded into a count-min sketch whenever the
+# buffer fills up again, so memory stays bounded however large the input.
+MAX_EXACT_KEYS = 1 << 17
+
+SKETCH_WIDTH = 1 << 14
+SKETCH_DEPTH = 4
+HLL_PRECISION = 12
+
+# Words are runs of letters, digits and underscores, with inner apostrophes
+# ("don't"). A window ending in "x'" may continue as "x't", so that
+# apostrophe is kept with the fragment until the next window is seen.
+_WORD_RE = re.compile(r"\w+(?:'\w+)*")
+_STARTS_IN_WORD = re.compile(r"'?\w")
+_ENDS_IN_WORD = re.compile(r"\w'?\Z")
+_SEPARATOR = "\0"
+
+
+def _hash64(key):
+    # Stable across processes (unlike hash()), so sketches built by
+    # different workers can be merged
+    return int.from_bytes(hashlib.blake2b(key.encode("utf-8", "surrogatepass"), digest_size=8).digest(), "little")
+
+
+class CountMinSketch:
+    """Approximate counts that never underestimate; mergeable by addition."""
+
+    def __init__(self, width=SKETCH_WIDTH, depth=SKETCH_DEPTH):
+        self.width = width
+        self.depth = depth
+        self.rows = [array("q", bytes(8 * width)) for _ in range(depth)]
+
+    def _columns(self, h):
+        # Double hashing: depth columns from one 64-bit hash
+        h1, h2 = h & 0xFFFFFFFF, h >> 32 | 1
+        return [(h1 + i * h2) % self.width for i in range(self.depth)]
+
+    def add(self, h, count=1):
+        return self.add_many([(h, count)])[0]
+
+    def add_many(self, pairs):
+        # Add (hash, count) pairs; returns each key's new estimate
+        rows, width = self.rows, self.width
+        estimates = []
+        for h, count in pairs:
+            h1, h2 = h & 0xFFFFFFFF, h >> 32 | 1
+            estimate = None
+            for row in rows:
+                column = h1 % width
+                value = row[column] = row[column] + count
+                if estimate is None or value < estimate:
+                    estimate = value
+                h1 += h2
+            estimates.append(estimate)
+        return estimates
+
+    def estimate(self, h):
+        return min(row[column] for row, column in zip(self.rows, self._columns(h)))
+
+    def merge(self, other):
+        if (other.width, other.depth) != (self.width, self.depth):
+            raise ValueError("Cannot merge sketches of different sizes")
+        for i, (row, theirs) in enumerate(zip(self.rows, other.rows)):
+            self.rows[i] = array("q", map(int.__add__, row, theirs))
+        return self
+
+    def copy(self):
+        sketch = CountMinSketch.__new__(CountMinSketch)
+        sketch.width, sketch.depth = self.width, self.depth
+        sketch.rows = [array("q", row) for row in self.rows]
+        return sketch
+
+
+class HyperLogLog:
+    """Approximate distinct count (about 1.6% error at precision 12)."""
+
+    def __init__(self, precision=HLL_PRECISION):
+        self.precision = precision
+        self.registers = bytearray(1 << precision)
+
+    def add(self, h):
+        self.add_many([h])
+
+    def add_many(self, hashes):
+        bits = 64 - self.precision
+        low = (1 << bits) - 1
+        registers = self.registers
+        for h in hashes:
+            index = h >> bits
+            rank = bits - (h & low).bit_length() + 1
+            if rank > registers[index]:
+                registers[index] = rank
+
+    def count(self):
+        m = len(self.registers)
+        estimate = 0.7213 / (1 + 1.079 / m) * m * m / sum(2.0 ** -r for r in self.registers)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * math.log(m / zeros)  # linear counting for small sets
+        return round(estimate)
+
+    def merge(self, other):
+        if other.precision != self.precision:
+            raise ValueError("Cannot merge HyperLogLogs of different precision")
+        self.registers = bytearray(map(max, self.registers, other.registers))
+        return self
+
+    def copy(self):
+        hll = HyperLogLog.__new__(HyperLogLog)
+        hll.precision = self.precision
+        hll.registers = bytearray(self.registers)
+        return hll
+
+
+class FrequencyTable:
+    """Counts of string keys with bounded memory.
+
+    Counts are exact while there are at most max_exact distinct keys. Beyond
+    that, a count-min sketch holds the totals, a HyperLogLog the distinct
+    count, and a candidate heap of a few times top_k keys the likely heavy
+    hitters. New counts are buffered exactly and folded in when the buffer
+    fills, so keys repeated within a buffer are hashed once.
+    """
+
+    def __init__(self, top_k=DEFAULT_TOP_K, max_exact=MAX_EXACT_KEYS):
+        self.top_k = top_k
+        self.max_exact = max_exact
+        self.total = 0
+        self.buffer = Counter()
+        self.sketch = None  # set once the table stops being exact
+        self.hll = None
+        self.candidates = {}  # key -> estimate when last seen
+
+    @property
+    def exact(self):
+        return self.sketch is None
+
+    def _capacity(self):
+        return max(4 * self.top_k, 64)
+
+    def update(self, counts):
+        self.buffer.update(counts)
+        self.total += sum(counts.values())
+        if len(self.buffer) > self.max_exact:
+            self._fold()
+
+    def remove(self, key, count=1):
+        # Take back a count, e.g. for a word found to be only a fragment
+        self.buffer[key] -= count
+        if not self.buffer[key]:
+            del self.buffer[key]
+        self.total -= count
+
+    def _fold(self):
+        if self.sketch is None:
+            self.sketch = CountMinSketch()
+            self.hll = HyperLogLog()
+        candidates = self.candidates
+        capacity = self._capacity()
+        floor = min(candidates.values(), default=0)
+        keys = list(self.buffer)
+        hashes = [_hash64(key) for key in keys]
+        counts = self.buffer.values()
+        estimates = self.sketch.add_many(zip(hashes, counts))
+        self.hll.add_many(h for h, count in zip(hashes, counts) if count > 0)
+        for key, estimate in zip(keys, estimates):
+            if estimate > floor or len(candidates) < capacity or key in candidates:
+                candidates[key] = estimate
+        if len(candidates) > 2 * capacity:
+            self.candidates = dict(heapq.nlargest(capacity, candidates.items(), key=lambda item: item[1]))
+        self.buffer = Counter()
+
+    def merge(self, other):
+        self.buffer.update(other.buffer)
+        self.total += other.total
+        if other.sketch is not None:
+            if self.sketch is None:
+                self.sketch, self.hll = other.sketch.copy(), other.hll.copy()
+            else:
+                self.sketch.merge(other.sketch)
+                self.hll.merge(other.hll)
+            for key, estimate in other.candidates.items():
+                self.candidates[key] = max(self.candidates.get(key, 0), estimate)
+            self._fold()
+        elif len(self.buffer) > self.max_exact:
+            self._fold()
+        return self
+
+    def estimate(self, key):
+        count = self.buffer.get(key, 0)
+        if self.sketch is not None:
+            count += self.sketch.estimate(_hash64(key))
+        return count
+
+    def top(self, k=None):
+        k = k or self.top_k
+        if self.sketch is None:
+            return [(key, n) for key, n in self.buffer.most_common(k) if n > 0]
+        keys = set(self.candidates)
+        keys.update(key for key, _ in self.buffer.most_common(self._capacity()))
+        return heapq.nlargest(k, ((key, self.estimate(key)) for key in keys), key=lambda item: item[1])
+
+    def distinct(self):
+        if self.sketch is None:
+            return sum(1 for n in self.buffer.values() if n > 0)
+        hll = self.hll.copy()
+        for key, n in self.buffer.items():
+            if n > 0:
+                hll.add(_hash64(key))
+        return hll.count()
+
+
+def _char_ngrams(keys, n):
+    # Overlapping n-grams within each word; the separator never occurs in
+    # a word, so no n-gram spans two words
+    if n <= 0:
+        return Counter()
+    return Counter(re.findall(f"(?=([^{_SEPARATOR}]{{{n}}}))", _SEPARATOR.join(keys)))
+
+
+def _word_ngrams(keys, n):
+    if n <= 1:
+        return Counter()
+    return Counter(map(" ".join, zip(*(keys[i:] for i in range(n)))))
+
+
+def _tokenize(text):
+    # Raw words of text, plus whether it starts/ends inside a word. An
+    # apostrophe at either edge next to a word is kept on that word.
+    tokens = _WORD_RE.findall(text)
+    if not tokens:
+        return [], False, False
+    starts_in_word = _STARTS_IN_WORD.match(text) is not None
+    ends_in_word = _ENDS_IN_WORD.search(text, max(len(text) - 2, 0)) is not None
+    if starts_in_word and text[0] == "'":
+        tokens[0] = "'" + tokens[0]
+    if ends_in_word and text[-1] == "'":
+        tokens[-1] += "'"
+    return tokens, starts_in_word, ends_in_word
+
+
+def _key(token):
+    return token.strip("'").lower()
+
+
+def _keys(tokens):
+    # Lower-case every word in one call; only the edge words can carry an
+    # apostrophe to strip
+    keys = _SEPARATOR.join(tokens).lower().split(_SEPARATOR)
+    keys[0] = keys[0].strip("'")
+    keys[-1] = keys[-1].strip("'")
+    return keys
+
+
+class WordFrequencies:
+    """Word, word n-gram and character n-gram frequencies for a run of text.
+
+    Like TextStats, frequencies for consecutive pieces of text can be
+    merged: every piece counts its edge words as if they were whole, and
+    merge() takes back the two halves of a word cut at the boundary and
+    counts the joined word and the n-grams around it instead.
+    """
+
+    def __init__(self, top_k=DEFAULT_TOP_K, word_n=WORD_NGRAM, char_n=CHAR_NGRAM, max_exact=MAX_EXACT_KEYS):
+        self.top_k = top_k
+        self.word_n = word_n
+        self.char_n = char_n
+        self.max_exact = max_exact
+        self.words = FrequencyTable(top_k, max_exact)
+        self.word_ngrams = FrequencyTable(top_k, max_exact)
+        self.char_ngrams = FrequencyTable(top_k, max_exact)
+        self.length = 0
+        self.tokens = 0
+        # Raw first and last max(word_n, 1) words, and whether the text
+        # starts/ends inside a word, for joining with neighbouring pieces.
+        # A lone "'" has no words but starts and ends inside one, since it
+        # can join "x" and "y" into "x'y".
+        self.head = []
+        self.tail = []
+        self.starts_in_word = False
+        self.ends_in_word = False
+
+    def _empty(self):
+        return WordFrequencies(self.top_k, self.word_n, self.char_n, self.max_exact)
+
+    @classmethod
+    def of(cls, text, cancel=None, stage=None, **options):
+        freqs = cls(**options)
+        freqs.feed(text, cancel, stage)
+        return freqs
+
+    def feed(self, text, cancel=None, stage=None):
+        for start in range(0, len(text), WINDOW_SIZE):
+            if cancel is not None and cancel.is_set():
+                raise AnalysisCancelled()
+            self.merge(self._scan(text[start:start + WINDOW_SIZE], stage))
+        return self
+
+    def _scan(self, window, stage=None):
+        stage = stage or _no_stage
+        freqs = self._empty()
+        with stage("frequency.words"):
+            freqs.length = len(window)
+            tokens, freqs.starts_in_word, freqs.ends_in_word = _tokenize(window)
+            if not tokens:
+                freqs.starts_in_word = freqs.ends_in_word = window == "'"
+                return freqs
+            keys = _keys(tokens)
+            freqs.tokens = len(tokens)
+            edge = max(self.word_n, 1)
+            freqs.head = tokens[:edge]
+            freqs.tail = tokens[-edge:]
+            freqs.words.update(Counter(keys))
+        with stage("frequency.ngrams"):
+            freqs.word_ngrams.update(_word_ngrams(keys, self.word_n))
+            freqs.char_ngrams.update(_char_ngrams(keys, self.char_n))
+        return freqs
+
+    def merge(self, other, adjacent=True):
+        # Append the frequencies of the text that follows this one. With
+        # adjacent=False the pieces are separate documents (e.g. two files),
+        # so nothing is joined across the boundary.
+        if (other.word_n, other.char_n) != (self.word_n, self.char_n):
+            raise ValueError("Cannot merge frequencies with different n-gram sizes")
+        if not other.length:
+            return self
+        if not self.length:
+            self.words.merge(other.words)
+            self.word_ngrams.merge(other.word_ngrams)
+            self.char_ngrams.merge(other.char_ngrams)
+            self.length, self.tokens = other.length, other.tokens
+            self.head, self.tail = list(other.head), list(other.tail)
+            self.starts_in_word, self.ends_in_word = other.starts_in_word, other.ends_in_word
+            return self
+        if not other.tokens or not self.tokens:
+            return self._merge_wordless(other, adjacent)
+
+        left, right = self.tail, other.head
+        self_tokens = self.tokens
+        self.length += other.length
+        self.words.merge(other.words)
+        self.word_ngrams.merge(other.word_ngrams)
+        self.char_ngrams.merge(other.char_ngrams)
+        self.tokens += other.tokens
+        if not adjacent:
+            self.tail = list(other.tail)
+            self.ends_in_word = other.ends_in_word
+            return self
+
+        n = self.word_n
+        if self.ends_in_word and other.starts_in_word:
+            # Undo the two halves of the word cut at the boundary, then count
+            # the whole word (which may re-split, e.g. "x'" + "'y")
+            joined = _tokenize(left[-1] + right[0])[0]
+            for half in (left[-1], right[0]):
+                key = _key(half)
+                self.words.remove(key)
+                self.char_ngrams.update(Counter({gram: -c for gram, c in _char_ngrams([key], self.char_n).items()}))
+            joined_keys = [_key(token) for token in joined]
+            self.words.update(Counter(joined_keys))
+            self.char_ngrams.update(_char_ngrams(joined_keys, self.char_n))
+            self.tokens += len(joined) - 2
+            removed = []
+            if n > 1 and len(left) >= n:
+                removed.append(" ".join(map(_key, left[-n:])))
+            if n > 1 and len(right) >= n:
+                removed.append(" ".join(map(_key, right[:n])))
+            for gram in removed:
+                self.word_ngrams.remove(gram)
+            sequence = left[:-1] + joined + right[1:]
+            # New n-grams are those containing any of the joined words
+            first, last = len(left) - 1, len(left) - 2 + len(joined)
+            starts = range(max(0, first - n + 1), min(last, len(sequence) - n) + 1)
+        else:
+            sequence = left + right
+            # New n-grams are those spanning the boundary
+            starts = range(max(0, len(left) - n + 1), min(len(left) - 1, len(sequence) - n) + 1)
+        if n > 1:
+            keys = [_key(token) for token in sequence]
+            self.word_ngrams.update(Counter(" ".join(keys[i:i + n]) for i in starts))
+
+        edge = max(n, 1)
+        if self_tokens <= edge:
+            self.head = sequence[:edge]
+        if other.tokens <= edge:
+            self.tail = sequence[-edge:]
+        else:
+            self.tail = list(other.tail)
+        self.ends_in_word = other.ends_in_word
+        return self
+
+    def _merge_wordless(self, other, adjacent):
+        # One side has no words: only the boundary state changes, unless a
+        # lone "'" glues onto the neighbouring word
+        glue = adjacent and self.ends_in_word and other.starts_in_word
+        if not other.tokens:
+            if glue and self.tokens and not self.tail[-1].endswith("'"):
+                self.tail[-1] += "'"
+                if self.tokens <= len(self.head):
+                    self.head[-1] = self.tail[-1]
+            else:
+                self.ends_in_word = False
+            if not self.tokens:
+                self.starts_in_word = False  # two or more characters, none in a word
+        else:
+            self.words.merge(other.words)
+            self.word_ngrams.merge(other.word_ngrams)
+            self.char_ngrams.merge(other.char_ngrams)
+            self.tokens = other.tokens
+            self.head, self.tail = list(other.head), list(other.tail)
+            glue = glue and not self.head[0].startswith("'")
+            if glue:
+                self.head[0] = "'" + self.head[0]
+                if other.tokens <= len(self.tail):
+                    self.tail[0] = self.head[0]
+            self.starts_in_word = glue
+            self.ends_in_word = other.ends_in_word
+        self.length += other.length
+        return self
+
+    @property
+    def exact(self):
+        return self.words.exact and self.word_ngrams.exact and self.char_ngrams.exact
+
+    def as_dict(self, k=None):
+        return {
+            "exact": self.exact,
+            "total_words": self.words.total,
+            "distinct_words": self.words.distinct(),
+            "top_words": self.words.top(k),
+            "top_word_ngrams": self.word_ngrams.top(k),
+            "top_char_ngrams": self.char_ngrams.top(k),
+        }
@@ -0,0 +1,226 @@
+import json
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager, nullcontext
+
+# cProfile, pstats and tracemalloc are imported where they are used; pstats
+# alone takes longer to import than the whole analysis core.
+
+_NULL_STAGE = nullcontext()
+
+
+class Histogram:
+    """Latency histogram with log-linear nanosecond buckets.
+
+    Each power of two is split into 16 equal buckets, so a percentile is
+    within 1/16 (about 6%) of the true value.
+    """
+
+    SUB_BITS = 4
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = 0
+        self.buckets = {}  # bucket lower bound in ns -> count
+
+    def add(self, ns):
+        self.count += 1
+        self.total += ns
+        self.min = ns if self.min is None else min(self.min, ns)
+        self.max = max(self.max, ns)
+        ns = int(ns)
+        shift = max(ns.bit_length() - self.SUB_BITS - 1, 0)
+        bucket = ns >> shift << shift
+        self.buckets[bucket] = self.buckets.get(bucket, 0) + 1
+
+    def percentile(self, fraction):
+        # Upper bound of the bucket holding the requested rank
+        if not self.count:
+            return 0
+        rank = fraction * self.count
+        seen = 0
+        for bucket in sorted(self.buckets):
+            seen += self.buckets[bucket]
+            if seen >= rank:
+                shift = max(bucket.bit_length() - self.SUB_BITS - 1, 0)
+                return min(bucket + (1 << shift) - 1, self.max)
+        return self.max
+
+    def as_dict(self):
+        return {
+            "count": self.count,
+            "mean_ns": self.total // self.count if self.count else 0,
+            "min_ns": self.min or 0,
+            "p50_ns": self.percentile(0.5),
+            "p95_ns": self.percentile(0.95),
+            "p99_ns": self.percentile(0.99),
+            "max_ns": self.max,
+            "buckets": {str(b): n for b, n in sorted(self.buckets.items())},
+        }
+
+
+class Instrumentation:
+    """Opt-in per-stage timings and allocation counts.
+
+    stage() times a block with perf_counter_ns and counts the memory blocks
+    it leaves allocated (sys.getallocatedblocks); with track_allocations it
+    also records the tracemalloc peak. tracemalloc has one process-wide peak,
+    so only one stage measures it at a time; overlapping stages (nested or on
+    other threads) record no peak. Inside run(), repeated stages (e.g.
+    one per scan window) are summed into one sample per stage for the run.
+    When disabled, stage() returns a shared no-op context.
+    """
+
+    def __init__(self, max_samples=5000):
+        self.enabled = False
+        self.track_allocations = False
+        self.samples = deque(maxlen=max_samples)
+        self.histograms = {}
+        self.runs = 0
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._profile = None  # cProfile.Profile, shared by all threads
+        self._profiling_thread = None  # thread running under _profile
+        self._peak_owner = None  # thread id of the stage measuring the peak
+        self.profiling = False
+
+    def set_track_allocations(self, enabled):
+        import tracemalloc
+        self.track_allocations = enabled
+        if enabled and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        elif not enabled and tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+    def stage(self, name):
+        if not self.enabled:
+            return _NULL_STAGE
+        return self._stage(name)
+
+    @contextmanager
+    def _stage(self, name):
+        tracing = self.track_allocations
+        if tracing:
+            import tracemalloc
+            tracing = tracemalloc.is_tracing() and self._claim_peak()
+        if tracing:
+            tracemalloc.reset_peak()
+            base = tracemalloc.get_traced_memory()[0]
+        blocks = sys.getallocatedblocks()
+        start = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter_ns() - start
+            blocks = sys.getallocatedblocks() - blocks
+            peak = None
+            if tracing:
+                peak = tracemalloc.get_traced_memory()[1] - base
+                self._peak_owner = None
+            totals = getattr(self._local, "totals", None)
+            if totals is None:
+                self._record(None, {name: [elapsed, blocks, peak]})
+            else:
+                entry = totals.setdefault(name, [0, 0, None])
+                entry[0] += elapsed
+                entry[1] += blocks
+                if peak is not None:
+                    entry[2] = max(entry[2] or 0, peak)
+
+    def _claim_peak(self):
+        with self._lock:
+            if self._peak_owner is not None:
+                return False
+            self._peak_owner = threading.get_ident()
+            return True
+
+    @contextmanager
+    def run(self, name):
+        # Group the stages of one analysis run; nested runs join the outer one
+        if not self.enabled or getattr(self._local, "totals", None) is not None:
+            yield
+            return
+        self._local.totals = {}
+        start = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            totals = self._local.totals
+            self._local.totals = None
+            totals[name] = [time.perf_counter_ns() - start, 0, None]
+            self._record(name, totals)
+
+    def _record(self, run, totals):
+        with self._lock:
+            self.runs += run is not None
+            for stage, (ns, blocks, peak) in totals.items():
+                self.histograms.setdefault(stage, Histogram()).add(ns)
+                self.samples.append({"run": self.runs if run else None, "stage": stage,
+                                     "ns": ns, "blocks": blocks, "peak_bytes": peak,
+                                     "time": time.time()})
+
+    def summary(self):
+        with self._lock:
+            return {stage: hist.as_dict() for stage, hist in sorted(self.histograms.items())}
+
+    def reset(self):
+        with self._lock:
+            self.samples.clear()
+            self.histograms.clear()
+            self.runs = 0
+            if self._profiling_thread is None:
+                self._profile = None
+
+    def export_json(self, path):
+        with self._lock:
+            data = {"runs": self.runs, "samples": list(self.samples)}
+        data["stages"] = self.summary()
+        with open(path, "w") as f:
+            json.dump(data, f, indent=2)
+
+    def call(self, func, *args):
+        # Run func under the profiler while profiling is on. Only one
+        # profiler can be active per process (sys.monitoring on 3.12+), so
+        # one thread at a time is profiled; calls made meanwhile from other
+        # threads, nested calls, and calls made while another tool holds the
+        # profiling hooks run unprofiled.
+        if not self.profiling:
+            return func(*args)
+        import cProfile
+        with self._lock:
+            if self._profiling_thread is not None:
+                profile = None
+            else:
+                if self._profile is None:
+                    self._profile = cProfile.Profile()
+                profile = self._profile
+                self._profiling_thread = threading.get_ident()
+        if profile is None:
+            return func(*args)
+        try:
+            try:
+                profile.enable()
+            except ValueError:
+                return func(*args)
+            try:
+                return func(*args)
+            finally:
+                profile.disable()
+        finally:
+            with self._lock:
+                self._profiling_thread = None
+
+    def dump_profile(self, path):
+        with self._lock:
+            if self._profile is None or self._profiling_thread is not None:
+                return False
+            import pstats
+            try:
+                pstats.Stats(self._profile).dump_stats(path)
+            except TypeError:  # nothing has been profiled yet
+                return False
+        return True
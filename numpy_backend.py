@@ -0,0 +1,182 @@
+import itertools
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; count_batch falls back to TextStats
+    np = None
+
+from analysis import DEFAULT_LOCALE, SENTENCE_TERMINATORS, TextStats, vowel_table
+
+COLUMNS = ("letters", "words", "sentences", "vowels", "consonants")
+
+# Documents are concatenated and counted together, up to this many
+# characters at a time, to keep the temporary arrays bounded (about 9 bytes
+# per character). Longer documents are counted in windows of this size and
+# joined with the TextStats boundary state.
+MAX_BATCH_CHARS = 1 << 22
+
+# There is one lookup table per locale, indexed by code point. Each entry
+# packs a character's vowel count (bits 0-1), consonant count (bits 2-3),
+# whitespace flag and terminator flag, so one table lookup classifies the
+# whole text. Entries are filled in the first time a character is seen, so
+# a table costs only the characters that actually occur.
+_TABLE_SIZE = 0x110000
+_SPACE = 1 << 4
+_TERMINATOR = 1 << 5
+_UNKNOWN = 0xFF
+_tables = {}  # locale -> table
+
+
+def available():
+    return np is not None
+
+
+def _pack(char, locale):
+    vowels, consonants = vowel_table(locale).classify(char)
+    cls = vowels | consonants << 2
+    if char.isspace():
+        cls |= _SPACE
+    if char in SENTENCE_TERMINATORS:
+        cls |= _TERMINATOR
+    return cls
+
+
+def _get_table(locale):
+    table = _tables.get(locale)
+    if table is None:
+        table = _tables[locale] = np.full(_TABLE_SIZE, _UNKNOWN, np.uint8)
+    return table
+
+
+def _classify(text, locale):
+    # Only called for non-ASCII text; ASCII is counted by TextStats
+    table = _get_table(locale)
+    codes = np.frombuffer(text.encode("utf-32-le", "surrogatepass"), np.uint32)
+    classes = table[codes]
+    unknown = classes == _UNKNOWN
+    if unknown.any():
+        new = np.unique(codes[unknown])
+        table[new] = np.fromiter((_pack(chr(cp), locale) for cp in new), np.uint8, len(new))
+        classes[unknown] = table[codes[unknown]]
+    return classes
+
+
+def _per_doc(values, starts, lengths):
+    # Sum a flat per-character array (at most 3 per character) over each
+    # document, accumulating in 32 bits when that cannot overflow
+    totals = np.zeros(len(starts), np.int64)
+    nonempty = lengths > 0
+    if nonempty.any():
+        dtype = np.uint32 if 3 * len(values) < 1 << 32 else np.int64
+        totals[nonempty] = np.add.reduceat(values, starts[nonempty], dtype=dtype)
+    return totals
+
+
+def _starts(lengths):
+    starts = np.zeros(len(lengths), np.int64)
+    np.cumsum(lengths[:-1], out=starts[1:])
+    return starts
+
+
+def _count_group(docs, locale):
+    # TextStats for each of docs, all of them counted together
+    lengths = np.fromiter((len(doc) for doc in docs), np.int64, len(docs))
+    starts = _starts(lengths)
+    counts = np.zeros((len(docs), len(COLUMNS)), np.int64)
+    counts[:, 0] = lengths
+    # starts_in_word, ends_in_word, head_sentence, tail_sentence, has_terminator
+    flags = np.zeros((len(docs), 5), np.bool_)
+    if not lengths.any():
+        return _to_stats(counts, flags)
+
+    classes = _classify("".join(docs), locale)
+    space = (classes & _SPACE).astype(np.bool_)
+
+    # Words start at a non-space following a space or a document start
+    begins = np.empty_like(space)
+    begins[0] = True
+    begins[1:] = space[:-1]
+    begins[starts[lengths > 0]] = True
+    begins &= ~space
+    counts[:, 1] = _per_doc(begins, starts, lengths)
+    nonempty = lengths > 0
+    flags[nonempty, 0] = ~space[starts[nonempty]]
+    flags[nonempty, 1] = ~space[starts[nonempty] + lengths[nonempty] - 1]
+
+    # With whitespace dropped, a sentence starts at a non-terminator whose
+    # predecessor is a terminator or lies in another document
+    solid = (classes[~space] & _TERMINATOR).astype(np.bool_)
+    if len(solid):
+        solid_lengths = _per_doc(~space, starts, lengths)
+        solid_starts = _starts(solid_lengths)
+        begins = np.empty_like(solid)
+        begins[0] = True
+        begins[1:] = solid[:-1]
+        begins[solid_starts[solid_lengths > 0]] = True
+        begins &= ~solid
+        counts[:, 2] = _per_doc(begins, solid_starts, solid_lengths)
+        # A sentence runs into the start (end) of a document when its first
+        # (last) non-blank character is not a terminator
+        has_solid = solid_lengths > 0
+        flags[has_solid, 2] = ~solid[solid_starts[has_solid]]
+        flags[has_solid, 3] = ~solid[solid_starts[has_solid] + solid_lengths[has_solid] - 1]
+        flags[:, 4] = _per_doc(solid, solid_starts, solid_lengths) > 0
+
+    counts[:, 3] = _per_doc(classes & 3, starts, lengths)
+    counts[:, 4] = _per_doc(classes >> 2 & 3, starts, lengths)
+    return _to_stats(counts, flags)
+
+
+def _to_stats(counts, flags):
+    result = []
+    for row, (starts_in_word, ends_in_word, head, tail, terminator) in zip(counts.tolist(), flags.tolist()):
+        stats = TextStats()
+        stats.letters, stats.words, stats.sentences, stats.vowels, stats.consonants = row
+        stats.starts_in_word, stats.ends_in_word = starts_in_word, ends_in_word
+        stats.head_sentence, stats.tail_sentence, stats.has_terminator = head, tail, terminator
+        result.append(stats)
+    return result
+
+
+def count_stats(docs, max_chars=MAX_BATCH_CHARS, locale=None):
+    # One TextStats per document, falling back to TextStats when NumPy is not
+    # installed. Short documents are grouped up to max_chars characters;
+    # longer ones are split into windows and the windows merged. ASCII
+    # windows go to TextStats' byte-level fast path, which beats the table
+    # lookups; NumPy pays off on non-ASCII text.
+    docs = list(docs)
+    locale = locale or DEFAULT_LOCALE
+    vowel_table(locale)  # unknown locales fail before any counting
+    if np is None:
+        return [TextStats.of(doc, locale=locale) for doc in docs]
+    result = [TextStats() for _ in docs]
+    windows = ((i, doc[start:start + max_chars]) for i, doc in enumerate(docs)
+               for start in range(0, len(doc), max_chars))
+    group, size = [], 0  # (doc index, window to count or its TextStats)
+    for i, window in itertools.chain(windows, [(None, None)]):
+        if window is not None and window.isascii():
+            group.append((i, TextStats._scan_ascii(window.encode("ascii"), locale=locale)))
+            continue
+        if group and (window is None or size + len(window) > max_chars):
+            counted = iter(_count_group([w for _, w in group if isinstance(w, str)], locale) if size else ())
+            # Windows of a document are merged in order
+            for j, w in group:
+                result[j].merge(next(counted) if isinstance(w, str) else w)
+            group, size = [], 0
+        if window is not None:
+            group.append((i, window))
+            size += len(window)
+    return result
+
+
+def count_batch(docs, max_chars=MAX_BATCH_CHARS, locale=None):
+    # One row of COLUMNS counts per document. Returns an int64 matrix, or a
+    # list of lists computed by TextStats when NumPy is not installed.
+    rows = [[getattr(stats, name) for name in COLUMNS] for stats in count_stats(docs, max_chars, locale)]
+    if np is None:
+        return rows
+    return np.array(rows, np.int64).reshape(len(rows), len(COLUMNS))
+
+
+def count(text, locale=None):
+    return dict(zip(COLUMNS, (int(n) for n in count_batch([text], locale=locale)[0])))
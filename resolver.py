@@ -0,0 +1,171 @@
+import asyncio
+import inspect
+import math
+import re
+import socket
+import threading
+import time
+
+# Dotted names ending in an alphabetic TLD: example.com, www.example.co.uk,
+# and the host part of URLs and e-mail addresses.
+_DOMAIN_RE = re.compile(r"(?<![\w.-])(?:[A-Za-z0-9](?:[A-Za-z0-9-]{0,61}[A-Za-z0-9])?\.)+[A-Za-z]{2,63}(?![\w-])")
+
+DEFAULT_CONCURRENCY = 8
+DEFAULT_TIMEOUT = 2.0
+DEFAULT_TTL = 300.0
+# Failed lookups are cached for a shorter time
+NEGATIVE_TTL = 30.0
+
+
+def find_domains(text):
+    # Unique domain-like tokens, lower-cased, in order of first appearance
+    return list(dict.fromkeys(match.group().lower() for match in _DOMAIN_RE.finditer(text)))
+
+
+def system_lookup(domain):
+    return socket.gethostbyname(domain)
+
+
+def latency_summary(values):
+    # min/avg/p95 (nearest rank) of a list of latencies in milliseconds
+    if not values:
+        return {"count": 0, "min": None, "avg": None, "p95": None}
+    ordered = sorted(values)
+    return {
+        "count": len(ordered),
+        "min": ordered[0],
+        "avg": sum(ordered) / len(ordered),
+        "p95": ordered[math.ceil(0.95 * len(ordered)) - 1],
+    }
+
+
+class TTLCache:
+    """Lookup results that expire after a fixed time."""
+
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self._entries = {}  # key -> (expires, value)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= self.clock():
+            del self._entries[key]
+            return None
+        return entry[1]
+
+    def put(self, key, value, ttl):
+        self._entries[key] = (self.clock() + ttl, value)
+
+    def clear(self):
+        self._entries.clear()
+
+
+def _settle(future, result, error):
+    if future.done():  # timed out or cancelled meanwhile
+        if inspect.iscoroutine(result):
+            result.close()
+        return
+    if error is not None:
+        future.set_exception(error)
+    else:
+        future.set_result(result)
+
+
+def _in_thread(func, arg):
+    # Run a blocking call on its own daemon thread. A lookup that hangs past
+    # its timeout keeps only that thread busy, never a pool slot or the exit
+    # of the event loop.
+    loop = asyncio.get_running_loop()
+    future = loop.create_future()
+
+    def run():
+        try:
+            result, error = func(arg), None
+        except Exception as e:
+            result, error = None, e
+        try:
+            loop.call_soon_threadsafe(_settle, future, result, error)
+        except RuntimeError:  # the loop has already finished
+            pass
+
+    threading.Thread(target=run, daemon=True).start()
+    return future
+
+
+class DomainResolver:
+    """Resolves many domains concurrently without blocking the caller.
+
+    lookup(domain) returns an address, or an awaitable of one; it is called
+    on a thread (socket.gethostbyname by default blocks) and an awaitable it
+    returns, e.g. from a stub resolver in tests, is awaited on the loop. At most `concurrency` lookups run at once, each
+    is abandoned after `timeout` seconds, and results are cached for `ttl`
+    seconds (failures for NEGATIVE_TTL).
+    """
+
+    def __init__(self, lookup=system_lookup, concurrency=DEFAULT_CONCURRENCY,
+                 timeout=DEFAULT_TIMEOUT, ttl=DEFAULT_TTL, negative_ttl=NEGATIVE_TTL, clock=time.monotonic):
+        self.lookup = lookup
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.cache = TTLCache(clock)
+        self._lock = threading.Lock()
+
+    async def _lookup(self, domain):
+        result = await _in_thread(self.lookup, domain)
+        if inspect.isawaitable(result):
+            result = await result
+        return result
+
+    async def resolve(self, domain, limit=None):
+        # One result dict: domain, address, error, ms, cached
+        with self._lock:
+            hit = self.cache.get(domain)
+        if hit is not None:
+            address, error = hit
+            return {"domain": domain, "address": address, "error": error, "ms": 0.0, "cached": True}
+        if limit is None:
+            limit = asyncio.Semaphore(self.concurrency)
+        async with limit:
+            start = time.perf_counter_ns()
+            try:
+                address, error = await asyncio.wait_for(self._lookup(domain), self.timeout), None
+            except asyncio.TimeoutError:
+                address, error = None, f"timed out after {self.timeout:g} s"
+            except Exception as e:
+                address, error = None, str(e) or type(e).__name__
+            elapsed = time.perf_counter_ns() - start
+        with self._lock:
+            self.cache.put(domain, (address, error), self.ttl if error is None else self.negative_ttl)
+        return {"domain": domain, "address": address, "error": error, "ms": elapsed / 1e6, "cached": False}
+
+    async def resolve_all(self, domains, on_result=None):
+        # Results are passed to on_result as they complete and returned in
+        # the order of `domains`
+        limit = asyncio.Semaphore(self.concurrency)
+
+        async def one(domain):
+            result = await self.resolve(domain, limit)
+            if on_result is not None:
+                on_result(result)
+            return result
+
+        return await asyncio.gather(*(one(domain) for domain in domains))
+
+    def start(self, domains, on_result, on_done=None):
+        # Resolve on a background thread with its own event loop. on_result
+        # and on_done are called from that thread.
+        def run():
+            results = asyncio.run(self.resolve_all(domains, on_result))
+            if on_done is not None:
+                on_done(results)
+
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+        return thread
@@ -0,0 +1,322 @@
+import asyncio
+import json
+import multiprocessing
+import os
+import signal
+import time
+from concurrent.futures import ProcessPoolExecutor
+from http import HTTPStatus
+
+from analysis import CONVERSIONS, AnalysisResult, TextStats
+from cache import ResultCache, content_digest
+from instrument import Histogram
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+
+# Request bodies larger than this are refused with 413
+MAX_BODY = 64 << 20
+
+# Documents shorter than this are coalesced: while every worker is busy,
+# pending small documents are held and sent together, up to BATCH_CHARS
+# characters per worker call, as soon as a worker frees up.
+COALESCE_CHARS = 1 << 16
+BATCH_CHARS = 1 << 20
+
+
+class RequestError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def _payload(text, stats, conversions):
+    result = AnalysisResult(text, stats)
+    return json.dumps(result.as_dict(conversions)).encode("utf-8", "surrogatepass")
+
+
+def _analyze_doc(text, conversions, stats=None):
+    # Runs in a worker process: counts (unless already known) and the JSON
+    # response body with the requested conversions, so neither the
+    # conversions nor the encoding of a large document block the event loop
+    if stats is None:
+        stats = TextStats.of(text)
+    return stats, _payload(text, stats, conversions)
+
+
+def _count_docs(docs):
+    # Runs in a worker process, on (text, conversions) pairs. The NumPy
+    # backend counts the non-ASCII documents of a batch together, 3-5 times
+    # faster than TextStats; ASCII ones, and all of them when NumPy is not
+    # installed, take TextStats' byte-level path.
+    import numpy_backend
+    counted = numpy_backend.count_stats([text for text, _ in docs])
+    return [(stats, _payload(text, stats, conversions)) for (text, conversions), stats in zip(docs, counted)]
+
+
+def _parse_body(body, plain):
+    text = body.decode("utf-8")
+    return text if plain else json.loads(text)
+
+
+class _Batcher:
+    """Collects small documents and counts them in one worker call."""
+
+    def __init__(self, executor, slots, max_chars=BATCH_CHARS):
+        self.executor = executor
+        self.slots = slots
+        self.max_chars = max_chars
+        self.pending = []  # ((text, conversions), future)
+        self.size = 0
+        self.running = 0
+        self.batches = 0
+        self.documents = 0
+
+    def submit(self, text, conversions):
+        future = asyncio.get_running_loop().create_future()
+        self.pending.append(((text, conversions), future))
+        self.size += len(text)
+        if self.running < self.slots or self.size >= self.max_chars:
+            self.flush()
+        return future
+
+    def flush(self):
+        batch, self.pending, self.size = self.pending, [], 0
+        if not batch:
+            return
+        self.running += 1
+        self.batches += 1
+        self.documents += len(batch)
+        job = asyncio.get_running_loop().run_in_executor(self.executor, _count_docs, [doc for doc, _ in batch])
+        job.add_done_callback(lambda job: self._deliver(job, batch))
+
+    def _deliver(self, job, batch):
+        self.running -= 1
+        error = asyncio.CancelledError() if job.cancelled() else job.exception()
+        for i, (_, future) in enumerate(batch):
+            if future.done():
+                continue
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(job.result()[i])
+        self.flush()
+
+
+class AnalysisService:
+    """Long-lived analyzer serving HTTP/1.1 JSON over TCP or a Unix socket.
+
+    Connections are kept alive between requests. Counting runs in a process
+    pool: small documents are coalesced into batches, large ones go to a
+    worker on their own, and concurrent requests for the same text share one
+    job. Results come from a ResultCache when the text was seen before.
+
+        POST /analyze   {"text": "...", "conversions": ["upper"]} (or a text/plain body)
+        POST /batch     {"texts": ["...", ...], "conversions": [...]} -> {"results": [...]}
+        GET  /metrics   latency percentiles per route, cache and batch stats
+        GET  /health
+
+    "conversions" is optional and defaults to all of them; only the listed
+    conversions are computed.
+    """
+
+    def __init__(self, workers=None, cache=None):
+        # Spawned rather than forked, so workers never inherit the listening
+        # socket or open client connections
+        workers = workers or os.cpu_count() or 1
+        self.executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+        self.cache = cache if cache is not None else ResultCache(max_entries=1024, max_bytes=256 << 20)
+        self.batcher = _Batcher(self.executor, workers)
+        self.writers = set()
+        self.inflight = {}  # (digest, conversions) -> future of (TextStats, response body)
+        self.latency = {}  # route -> Histogram
+        self.requests = 0
+        self.errors = 0
+        self.connections = 0
+        self.shared = 0
+        self.started = time.time()
+
+    def close(self):
+        self.executor.shutdown(cancel_futures=True)
+
+    async def analyze(self, text, conversions=CONVERSIONS):
+        # Response body for one document, as JSON bytes. Digests, conversions
+        # and encoding of large documents run off the event loop.
+        loop = asyncio.get_running_loop()
+        conversions = tuple(conversions)
+        large = len(text) >= COALESCE_CHARS
+        key = await loop.run_in_executor(None, content_digest, text) if large else content_digest(text)
+        result = self.cache.get(text, key)
+        if result is not None and not large:
+            return json.dumps(result.as_dict(conversions)).encode("utf-8", "surrogatepass")
+        job = (key, conversions)
+        future = self.inflight.get(job)
+        if future is None:
+            if result is not None:
+                future = loop.run_in_executor(self.executor, _analyze_doc, text, conversions, result.stats)
+            elif large:
+                future = loop.run_in_executor(self.executor, _analyze_doc, text, conversions)
+            else:
+                future = self.batcher.submit(text, conversions)
+            self.inflight[job] = future
+            future.add_done_callback(lambda f: self.inflight.pop(job, None))
+        else:
+            self.shared += 1
+        stats, payload = await asyncio.shield(future)
+        if result is None:
+            self.cache.put(text, AnalysisResult(text, stats), key)
+        return payload
+
+    async def analyze_many(self, texts, conversions=CONVERSIONS):
+        return await asyncio.gather(*(self.analyze(text, conversions) for text in texts))
+
+    def metrics(self):
+        return {
+            "uptime": round(time.time() - self.started, 3),
+            "connections": self.connections,
+            "requests": self.requests,
+            "errors": self.errors,
+            "latency": {route: hist.as_dict() for route, hist in sorted(self.latency.items())},
+            "cache": self.cache.stats(),
+            "batches": {
+                "batches": self.batcher.batches,
+                "documents": self.batcher.documents,
+                "shared": self.shared,
+            },
+        }
+
+    async def dispatch(self, method, path, headers, body):
+        # Response body as JSON bytes
+        if path == "/health":
+            return b'{"status": "ok"}'
+        if path == "/metrics":
+            return json.dumps(self.metrics()).encode("utf-8")
+        if path not in ("/analyze", "/batch"):
+            raise RequestError(HTTPStatus.NOT_FOUND, f"Unknown path {path}")
+        if method != "POST":
+            raise RequestError(HTTPStatus.METHOD_NOT_ALLOWED, f"{path} expects POST")
+        plain = path == "/analyze" and headers.get("content-type", "").startswith("text/plain")
+        try:
+            if len(body) >= COALESCE_CHARS:
+                data = await asyncio.get_running_loop().run_in_executor(None, _parse_body, body, plain)
+            else:
+                data = _parse_body(body, plain)
+        except ValueError as e:
+            raise RequestError(HTTPStatus.BAD_REQUEST, f"Invalid body: {e}")
+        if plain:
+            return await self.analyze(data)
+        conversions = data.get("conversions", list(CONVERSIONS)) if isinstance(data, dict) else []
+        if not isinstance(conversions, list) or not all(
+                isinstance(name, str) and name in CONVERSIONS for name in conversions):
+            raise RequestError(HTTPStatus.BAD_REQUEST, f"conversions must be a list of {', '.join(CONVERSIONS)}")
+        if path == "/analyze":
+            if not isinstance(data, dict) or not isinstance(data.get("text"), str):
+                raise RequestError(HTTPStatus.BAD_REQUEST, 'Expected {"text": "..."}')
+            return await self.analyze(data["text"], conversions)
+        texts = data.get("texts") if isinstance(data, dict) else None
+        if not isinstance(texts, list) or not all(isinstance(text, str) for text in texts):
+            raise RequestError(HTTPStatus.BAD_REQUEST, 'Expected {"texts": ["...", ...]}')
+        return b'{"results": [' + b", ".join(await self.analyze_many(texts, conversions)) + b"]}"
+
+    async def handle_connection(self, reader, writer):
+        self.connections += 1
+        self.writers.add(writer)
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                start = time.perf_counter_ns()
+                route = "invalid"
+                keep_alive = False
+                try:
+                    try:
+                        method, target, version = request_line.decode("latin-1").split()
+                    except ValueError:
+                        raise RequestError(HTTPStatus.BAD_REQUEST, "Malformed request line")
+                    headers = {}
+                    while True:
+                        line = await reader.readline()
+                        if line in (b"\r\n", b"\n", b""):
+                            break
+                        name, _, value = line.decode("latin-1").partition(":")
+                        name, value = name.strip().lower(), value.strip()
+                        if name == "content-length" and headers.get(name, value) != value:
+                            raise RequestError(HTTPStatus.BAD_REQUEST, "Conflicting Content-Length headers")
+                        headers[name] = value
+                    connection = headers.get("connection", "").lower()
+                    keep_alive = connection == "keep-alive" or (version == "HTTP/1.1" and connection != "close")
+                    if "transfer-encoding" in headers:
+                        keep_alive = False
+                        raise RequestError(HTTPStatus.LENGTH_REQUIRED, "Chunked bodies are not supported")
+                    length = headers.get("content-length") or "0"
+                    # Digits only: int() would also take signs, spaces and
+                    # underscores, and a body length that is misread leaves
+                    # the rest of the body to be parsed as the next request
+                    if not (length.isascii() and length.isdigit()):
+                        keep_alive = False
+                        raise RequestError(HTTPStatus.BAD_REQUEST, "Invalid Content-Length")
+                    length = int(length)
+                    if length > MAX_BODY:
+                        keep_alive = False
+                        raise RequestError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, f"Body exceeds {MAX_BODY} bytes")
+                    body = await reader.readexactly(length) if length else b""
+                    route = target.split("?", 1)[0]
+                    status, data = HTTPStatus.OK, await self.dispatch(method, route, headers, body)
+                except RequestError as e:
+                    status, data = e.status, json.dumps({"error": str(e)}).encode("utf-8")
+                except Exception as e:
+                    keep_alive = False
+                    status, data = HTTPStatus.INTERNAL_SERVER_ERROR, json.dumps({"error": str(e)}).encode("utf-8")
+                if status != HTTPStatus.OK:
+                    self.errors += 1
+                self.requests += 1
+                writer.write(
+                    f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+                    f"Content-Type: application/json\r\n"
+                    f"Content-Length: {len(data)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode("latin-1") + data)
+                await writer.drain()
+                if route not in ("/analyze", "/batch", "/metrics", "/health"):
+                    route = "other"
+                self.latency.setdefault(route, Histogram()).add(time.perf_counter_ns() - start)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self.writers.discard(writer)
+            writer.close()
+
+    async def serve(self, host=DEFAULT_HOST, port=DEFAULT_PORT, unix_path=None):
+        if unix_path:
+            if os.path.exists(unix_path):
+                os.unlink(unix_path)
+            server = await asyncio.start_unix_server(self.handle_connection, unix_path)
+        else:
+            server = await asyncio.start_server(self.handle_connection, host, port)
+        address = unix_path or "{}:{}".format(*server.sockets[0].getsockname()[:2])
+        print(f"Text Analyzer service listening on {address}", flush=True)
+        stop = asyncio.Event()
+        try:
+            asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, stop.set)
+        except (NotImplementedError, AttributeError):  # Windows
+            pass
+        async with server:
+            await stop.wait()
+            # Idle keep-alive connections see EOF and finish
+            for writer in list(self.writers):
+                writer.close()
+            await asyncio.sleep(0.1)
+        if unix_path:
+            os.unlink(unix_path)
+
+
+def run_service(host=DEFAULT_HOST, port=DEFAULT_PORT, unix_path=None, workers=None):
+    service = AnalysisService(workers)
+    try:
+        asyncio.run(service.serve(host, port, unix_path))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.close()
@@ -0,0 +1,134 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from analysis import TextStats
+from cache import content_digest
+
+DEFAULT_RETENTION = 10
+
+
+def data_dir():
+    # Per-user directory for the store and cache, instead of the CWD
+    path = os.environ.get("TEXT_ANALYZER_HOME") or os.path.join(os.path.expanduser("~"), ".text_analyzer")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+class EntryStore:
+    """History and favorites kept in SQLite (WAL mode).
+
+    Entries are unique per (kind, digest), so adding a text is an indexed
+    lookup plus at most one insert, and each kind keeps only its newest
+    `retention` entries. Texts are stored verbatim, newlines included, next
+    to the TextStats state of their last analysis.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or os.path.join(data_dir(), "store.sqlite3")
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS entries (
+                id INTEGER PRIMARY KEY,
+                kind TEXT NOT NULL,
+                digest TEXT NOT NULL,
+                text TEXT NOT NULL,
+                stats TEXT,
+                created REAL NOT NULL,
+                UNIQUE (kind, digest)
+            );
+            CREATE INDEX IF NOT EXISTS entries_by_kind ON entries (kind, id);
+            CREATE TABLE IF NOT EXISTS settings (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL
+            );
+        """)
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def _setting(self, key, default=None):
+        row = self._db.execute("SELECT value FROM settings WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def _set_setting(self, key, value):
+        self._db.execute("INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)", (key, json.dumps(value)))
+
+    def retention(self, kind):
+        with self._lock:
+            return self._setting(f"retention.{kind}", DEFAULT_RETENTION)
+
+    def set_retention(self, kind, limit):
+        with self._lock:
+            self._set_setting(f"retention.{kind}", int(limit))
+            self._prune(kind, int(limit))
+
+    def _prune(self, kind, limit):
+        self._db.execute(
+            "DELETE FROM entries WHERE kind = ? AND id <= "
+            "(SELECT id FROM entries WHERE kind = ? ORDER BY id DESC LIMIT 1 OFFSET ?)",
+            (kind, kind, limit))
+
+    def add(self, kind, text, stats=None):
+        # Returns True when the text was new. An existing entry keeps its
+        # position; only its stored stats are refreshed.
+        digest = content_digest(text)
+        state = json.dumps(stats.state()) if stats is not None else None
+        with self._lock:
+            self._db.execute("BEGIN")
+            try:
+                row = self._db.execute("SELECT id FROM entries WHERE kind = ? AND digest = ?",
+                                       (kind, digest)).fetchone()
+                if row is None:
+                    self._db.execute(
+                        "INSERT INTO entries (kind, digest, text, stats, created) VALUES (?, ?, ?, ?, ?)",
+                        (kind, digest, text, state, time.time()))
+                    self._prune(kind, self._setting(f"retention.{kind}", DEFAULT_RETENTION))
+                elif state is not None:
+                    self._db.execute("UPDATE entries SET stats = ? WHERE id = ?", (state, row[0]))
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+        return row is None
+
+    def texts(self, kind):
+        # Newest first
+        with self._lock:
+            rows = self._db.execute("SELECT text FROM entries WHERE kind = ? ORDER BY id DESC", (kind,))
+            return [text for (text,) in rows]
+
+    def stats(self, kind, text):
+        with self._lock:
+            row = self._db.execute("SELECT stats FROM entries WHERE kind = ? AND digest = ?",
+                                   (kind, content_digest(text))).fetchone()
+        if row is None or row[0] is None:
+            return None
+        return TextStats.from_state(json.loads(row[0]))
+
+    def clear(self, kind):
+        with self._lock:
+            self._db.execute("DELETE FROM entries WHERE kind = ?", (kind,))
+
+    def import_lines(self, kind, path):
+        # One-time import of a legacy newline-separated file (newest first)
+        key = f"imported.{kind}"
+        with self._lock:
+            if self._setting(key) or not os.path.exists(path):
+                return
+            self._set_setting(key, True)
+        try:
+            with open(path, "r") as f:
+                lines = f.read().splitlines()
+        except OSError as e:
+            print(f"Error importing {path}:", e)
+            return
+        for line in reversed(lines):
+            if line:
+                self.add(kind, line)
@@ -0,0 +1,25 @@
+"""Reference formulas and random text shared by the tests."""
+
+# Spaces of several kinds, terminators, non-ASCII letters, a combining mark,
+# an astral emoji and characters whose case mapping changes their length
+ALPHABET = "aeiouxyzAEIOU .!?\n\t\x1c　 İΣé\U0001F600́,"
+
+
+def reference(phrase):
+    # The original TextInfo formulas
+    return {
+        "letters": len(phrase),
+        "words": len(phrase.split()),
+        "sentences": len([s for s in phrase.replace("!", ".").replace("?", ".").split(".") if s.strip()]),
+        "vowels": sum(1 for c in phrase.lower() if c in "aeiou"),
+        "consonants": sum(1 for c in phrase.lower() if c.isalpha() and c not in "aeiou"),
+    }
+
+
+def random_text(rng, n, alphabet=ALPHABET):
+    return "".join(rng.choice(alphabet) for _ in range(n))
+
+
+def random_pieces(rng, text, parts=6):
+    cuts = sorted(rng.sample(range(len(text) + 1), min(len(text) + 1, rng.randint(0, parts))))
+    return [text[a:b] for a, b in zip([0] + cuts, cuts + [len(text)])]
@@ -0,0 +1,81 @@
+import contextlib
+import io
+import json
+import os
+import random
+import tempfile
+import unittest
+
+import analysis
+import TextInfo
+from analysis import TextStats
+from batch import batch_records, split_points
+from support import ALPHABET, random_text, reference
+
+
+class BatchTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, name, text):
+        path = os.path.join(self.tmp.name, name)
+        with open(path, "w", encoding="utf-8", newline="") as f:
+            f.write(text)
+        return path
+
+    def test_split_points(self):
+        text = random_text(random.Random(1), 20000, ALPHABET + "éé\U0001F600")
+        path = self.write("text.txt", text)
+        size = os.path.getsize(path)
+        with open(path, "rb") as f:
+            data = f.read()
+        for split_size in (1, 3, 1000, 7777, size + 1):
+            points = split_points(path, size, split_size)
+            self.assertEqual((points[0], points[-1]), (0, size))
+            self.assertEqual(points, sorted(set(points)))
+            # No character is cut in half
+            self.assertTrue(all(p == size or data[p] & 0xC0 != 0x80 for p in points))
+            # Pieces merged in order give the counts of the whole file
+            stats = TextStats()
+            for start, end in zip(points, points[1:]):
+                stats.merge(analysis.analyze_mmap(path, start, end, chunk_size=97))
+            self.assertEqual(stats.counts(), reference(text), split_size)
+
+    def test_records(self):
+        texts = ["Hello world. Bye!", "héllo\nwörld", ""]
+        paths = [self.write(f"{i}.txt", text) for i, text in enumerate(texts)]
+        missing = os.path.join(self.tmp.name, "missing.txt")
+        records = list(batch_records(paths + [missing], workers=2, split_size=4, batch_size=3))
+        for record, path, text in zip(records, paths, texts):
+            self.assertEqual(record, {"file": path, **reference(text)})
+        self.assertEqual(records[3]["file"], missing)
+        self.assertIn("error", records[3])
+        aggregate = records[4]
+        self.assertEqual((aggregate["aggregate"], aggregate["files"], aggregate["failed"]), (True, 3, 1))
+        self.assertEqual(aggregate["words"], sum(reference(text)["words"] for text in texts))
+
+    def test_cli_output_and_exit_status(self):
+        docs = os.path.join(self.tmp.name, "docs")
+        os.mkdir(docs)
+        good = self.write(os.path.join("docs", "a.txt"), "one two. three")
+        # A dangling link is listed with the directory but cannot be read
+        broken = os.path.join(docs, "b.txt")
+        os.symlink(os.path.join(self.tmp.name, "missing.txt"), broken)
+        output = os.path.join(self.tmp.name, "out.jsonl")
+        for mode in (["--batch", docs, "--workers", "1"], [good, broken]):
+            stdout = io.StringIO()
+            with contextlib.redirect_stdout(stdout), self.assertRaises(SystemExit) as exit:
+                TextInfo.main(mode + ["-o", output])
+            self.assertEqual(exit.exception.code, 1, mode)
+            self.assertEqual(stdout.getvalue(), "")
+            with open(output) as f:
+                records = [json.loads(line) for line in f]
+            self.assertEqual(records[0], {"file": good, **reference("one two. three")})
+            self.assertEqual(records[1]["file"], broken)
+            self.assertIn("error", records[1])
+
+if __name__ == "__main__":
+    unittest.main()
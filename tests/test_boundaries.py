@@ -0,0 +1,52 @@
+import random
+import unittest
+from unittest import mock
+
+import analysis
+from analysis import TextStats
+from support import random_pieces, random_text, reference
+
+
+class TextStatsTest(unittest.TestCase):
+    def setUp(self):
+        self.rng = random.Random(1)
+
+    def test_whole_text(self):
+        for _ in range(2000):
+            text = random_text(self.rng, self.rng.randint(0, 60))
+            self.assertEqual(TextStats.of(text).counts(), reference(text), repr(text))
+
+    def test_small_windows(self):
+        for window in (1, 2, 3, 7):
+            with mock.patch.object(analysis, "WINDOW_SIZE", window):
+                for _ in range(500):
+                    text = random_text(self.rng, self.rng.randint(0, 40))
+                    self.assertEqual(analysis.analyze(text).stats.counts(), reference(text), (window, text))
+
+    def test_chunked_feed(self):
+        for _ in range(1000):
+            text = random_text(self.rng, self.rng.randint(0, 60))
+            stats = TextStats()
+            for piece in random_pieces(self.rng, text):
+                stats.feed(piece)
+            self.assertEqual(stats.counts(), reference(text), repr(text))
+
+    def test_merge(self):
+        for _ in range(1000):
+            text = random_text(self.rng, self.rng.randint(0, 60))
+            parts = [TextStats.of(piece) for piece in random_pieces(self.rng, text)]
+            # Merge neighbours pairwise, as workers' results are combined
+            while len(parts) > 1:
+                parts = [parts[i].merge(parts[i + 1]) if i + 1 < len(parts) else parts[i]
+                         for i in range(0, len(parts), 2)]
+            merged = parts[0] if parts else TextStats()
+            self.assertEqual(merged.counts(), reference(text), repr(text))
+
+    def test_state_round_trip(self):
+        text = "Hello world. Again"
+        left = TextStats.from_state(TextStats.of(text).state())
+        self.assertEqual(left.merge(TextStats.of(" there!")).counts(), reference(text + " there!"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,77 @@
+import os
+import tempfile
+import unittest
+
+from analysis import AnalysisResult, TextStats, analyze
+from cache import ResultCache
+
+
+class ResultCacheTest(unittest.TestCase):
+    def test_hit_and_miss(self):
+        cache = ResultCache()
+        self.assertIsNone(cache.get("abc"))
+        cache.put("abc", analyze("abc"))
+        self.assertEqual(cache.get("abc").words, 1)
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+    def test_evicts_least_recently_used(self):
+        cache = ResultCache(max_entries=2)
+        for text in ("a", "b"):
+            cache.put(text, analyze(text))
+        cache.get("a")
+        cache.put("c", analyze("c"))
+        self.assertIsNone(cache.get("b"))
+        self.assertIsNotNone(cache.get("a"))
+        self.assertEqual(cache.evictions, 1)
+
+    def test_max_bytes(self):
+        texts = [str(i) * 1000 for i in range(5)]
+        size = analyze(texts[0]).memory_size()
+        cache = ResultCache(max_bytes=3 * size)
+        for text in texts:
+            cache.put(text, analyze(text))
+        self.assertEqual(len(cache), 3)
+        self.assertLessEqual(cache.bytes, cache.max_bytes)
+        # Too large to cache at all
+        cache.put("x" * 10000, analyze("x" * 10000))
+        self.assertIsNone(cache.get("x" * 10000))
+
+    def test_conversions_are_counted(self):
+        texts = [str(i) * 1000 for i in range(3)]
+        size = analyze(texts[0]).memory_size()
+        cache = ResultCache(max_bytes=3 * size + 100)
+        results = [analyze(text) for text in texts]
+        for text, res in zip(texts, results):
+            cache.put(text, res)
+        self.assertEqual(cache.bytes, sum(res.memory_size() for res in results))
+        # A new conversion grows the newest entry past the limit, so the
+        # oldest is evicted
+        results[2].convert("upper")
+        self.assertEqual(cache.bytes, results[1].memory_size() + results[2].memory_size())
+        self.assertIsNone(cache.get(texts[0]))
+        self.assertLessEqual(cache.bytes, cache.max_bytes)
+
+    def test_replaced_entry_is_not_resized(self):
+        cache = ResultCache()
+        old, new = analyze("abc"), analyze("abc")
+        cache.put("abc", old)
+        cache.put("abc", new)
+        old.convert("upper")
+        self.assertEqual(cache.bytes, new.memory_size())
+
+    def test_save_and_load_counts(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "cache.json")
+            cache = ResultCache(path=path)
+            cache.put("Hello world.", analyze("Hello world."))
+            cache.save()
+            loaded = ResultCache(path=path)
+            loaded.load()
+            hit = loaded.get("Hello world.")
+        self.assertIsInstance(hit, AnalysisResult)
+        self.assertEqual(hit.stats.counts(), TextStats.of("Hello world.").counts())
+        self.assertEqual(hit.upper, "HELLO WORLD.")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,87 @@
+import io
+import os
+import random
+import tempfile
+import unittest
+
+import analysis
+from convert import iter_conversion, iter_file_conversion, iter_stream_conversion, reverse_graphemes
+from support import random_text
+
+
+class ReverseGraphemesTest(unittest.TestCase):
+    def test_clusters_kept(self):
+        self.assertEqual(reverse_graphemes("abc"), "cba")
+        self.assertEqual(reverse_graphemes("noël"), "lëon")
+        self.assertEqual(reverse_graphemes("a\r\nb"), "b\r\na")
+        self.assertEqual(reverse_graphemes("x\U0001F44D\U0001F3FDy"), "y\U0001F44D\U0001F3FDx")
+        self.assertEqual(reverse_graphemes("\U0001F1EB\U0001F1F7\U0001F1E9\U0001F1EA"),
+                         "\U0001F1E9\U0001F1EA\U0001F1EB\U0001F1F7")
+        family = "\U0001F469‍\U0001F4BB"
+        self.assertEqual(reverse_graphemes(f"1{family}2"), f"2{family}1")
+        # A ZWJ only joins a pictograph after it
+        self.assertEqual(reverse_graphemes("a‍b"), "ba‍")
+
+    def test_chunks_match_whole(self):
+        rng = random.Random(5)
+        alphabet = "ab \r\ń̈‍\U0001F44D\U0001F3FD\U0001F1EB\U0001F1F7é"
+        for _ in range(1000):
+            text = random_text(rng, rng.randint(0, 80), alphabet)
+            whole = reverse_graphemes(text)
+            for chunk_size in (1, 2, 5, 16):
+                self.assertEqual("".join(iter_conversion(text, "reversed", chunk_size)), whole,
+                                 (chunk_size, text))
+
+    def test_case_chunks_match_whole(self):
+        rng = random.Random(6)
+        for _ in range(500):
+            text = random_text(rng, rng.randint(0, 80), "ab Σσİß.\n")
+            for name in ("lower", "upper", "title"):
+                whole = analysis.CONVERSIONS[name](text)
+                for chunk_size in (1, 3, 16):
+                    self.assertEqual("".join(iter_conversion(text, name, chunk_size)), whole,
+                                     (name, chunk_size, text))
+
+    def test_chunks_without_whitespace(self):
+        # CJK text has no whitespace to cut at; chunks stay about chunk_size
+        chunks = list(iter_conversion("漢字かなカナ" * 10000, "upper", 1000))
+        self.assertLessEqual(max(map(len, chunks)), 1000 + 64)
+        rng = random.Random(7)
+        for _ in range(300):
+            text = random_text(rng, rng.randint(0, 300), "abΣσİßǅ.")
+            for name in ("lower", "upper", "title"):
+                whole = analysis.CONVERSIONS[name](text)
+                for chunk_size in (1, 7, 100):
+                    self.assertEqual("".join(iter_conversion(text, name, chunk_size)), whole,
+                                     (name, chunk_size, text))
+
+
+class StreamConversionTest(unittest.TestCase):
+    def test_stream_matches_whole(self):
+        rng = random.Random(8)
+        for _ in range(300):
+            text = random_text(rng, rng.randint(0, 300), "ab Σσİßǅ.\n")
+            for name in ("original", "lower", "upper", "title"):
+                whole = text if name == "original" else analysis.CONVERSIONS[name](text)
+                for chunk_size in (1, 7, 100):
+                    read = io.StringIO(text).read
+                    self.assertEqual("".join(iter_stream_conversion(read, name, chunk_size)), whole,
+                                     (name, chunk_size, text))
+
+    def test_file_reversed_from_the_end(self):
+        rng = random.Random(9)
+        alphabet = "ab \r\ń̈‍\U0001F44D\U0001F3FD\U0001F1EB\U0001F1F7é漢"
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "in.txt")
+            for _ in range(300):
+                text = random_text(rng, rng.randint(0, 200), alphabet)
+                with open(path, "w", encoding="utf-8", newline="") as f:
+                    f.write(text)
+                for chunk_size in (1, 5, 64):
+                    self.assertEqual("".join(iter_file_conversion(path, "reversed", chunk_size)),
+                                     reverse_graphemes(text), (chunk_size, text))
+                self.assertEqual("".join(iter_file_conversion(path, "title", 5)), text.title())
+
+
+if __name__ == "__main__":
+    unittest.main()
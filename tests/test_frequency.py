@@ -0,0 +1,70 @@
+import random
+import unittest
+
+from analysis import IncrementalAnalyzer, TextStats
+from frequency import WordFrequencies
+from support import random_pieces
+
+
+class WordFrequenciesTest(unittest.TestCase):
+    ALPHABET = ["a", "b", "'", " ", "x", "É", "\n", ".", "don't", "İ", "ab'c", "''"]
+
+    def assertSameCounts(self, merged, whole, msg):
+        def clean(table):
+            return {key: count for key, count in table.buffer.items() if count}
+        self.assertEqual(clean(merged.words), clean(whole.words), msg)
+        self.assertEqual(clean(merged.word_ngrams), clean(whole.word_ngrams), msg)
+        self.assertEqual(clean(merged.char_ngrams), clean(whole.char_ngrams), msg)
+        self.assertEqual(merged.tokens, whole.tokens, msg)
+
+    def test_merge_matches_single_pass(self):
+        rng = random.Random(4)
+        for _ in range(2000):
+            text = "".join(rng.choice(self.ALPHABET) for _ in range(rng.randint(0, 60)))
+            whole = WordFrequencies.of(text)
+            pieces = random_pieces(rng, text)
+            merged = WordFrequencies()
+            for piece in pieces:
+                merged.merge(WordFrequencies.of(piece))
+            self.assertSameCounts(merged, whole, (text, pieces))
+            parts = [WordFrequencies.of(piece) for piece in pieces]
+            while len(parts) > 1:
+                parts = [parts[i].merge(parts[i + 1]) if i + 1 < len(parts) else parts[i]
+                         for i in range(0, len(parts), 2)]
+            if parts:
+                self.assertSameCounts(parts[0], whole, (text, pieces))
+
+    def test_observe_during_counting(self):
+        # The counting pass hands every window to the frequency index
+        rng = random.Random(5)
+        for _ in range(300):
+            text = "".join(rng.choice(self.ALPHABET) for _ in range(rng.randint(0, 60)))
+            freqs = WordFrequencies()
+            stats = TextStats()
+            for piece in random_pieces(rng, text):
+                stats.feed(piece, observe=freqs.feed)
+            self.assertSameCounts(freqs, WordFrequencies.of(text), text)
+
+    def test_observe_during_incremental_update(self):
+        # With observe, the incremental analyzer re-scans every block in
+        # order, so the frequencies match a full pass after any edit
+        rng = random.Random(6)
+        analyzer = IncrementalAnalyzer(5)
+        text = "hello world don't stop"
+        for _ in range(200):
+            i = rng.randint(0, len(text))
+            text = text[:i] + rng.choice(["ab ", "x'", "  ", "word. ", ""]) + text[i + rng.randint(0, 3):]
+            freqs = WordFrequencies()
+            observe = freqs.feed if rng.random() < 0.5 else None
+            stats = analyzer.update(text, observe=observe)
+            self.assertEqual(stats.counts(), TextStats.of(text).counts(), text)
+            if observe is not None:
+                self.assertSameCounts(freqs, WordFrequencies.of(text), text)
+
+    def test_top_words(self):
+        freqs = WordFrequencies.of("the cat and the hat and the bat")
+        self.assertEqual(freqs.words.top(2), [("the", 3), ("and", 2)])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,51 @@
+import random
+import unittest
+
+from analysis import IncrementalAnalyzer
+from support import random_text, reference
+
+
+class IncrementalAnalyzerTest(unittest.TestCase):
+    def setUp(self):
+        self.rng = random.Random(3)
+
+    def edit(self, text):
+        rng = self.rng
+        i = rng.randint(0, len(text))
+        j = rng.randint(i, len(text))
+        choice = rng.random()
+        if choice < 0.3 or not text:
+            return text[:i] + random_text(rng, rng.randint(0, 5)) + text[i:]
+        if choice < 0.6:
+            return text[:i] + text[j:]
+        if choice < 0.9:
+            return text[:i] + random_text(rng, j - i) + text[j:]
+        return random_text(rng, rng.randint(0, 40))
+
+    def test_edits(self):
+        for block_size in (1, 2, 3, 5, 16):
+            for _ in range(100):
+                analyzer = IncrementalAnalyzer(block_size)
+                text = random_text(self.rng, self.rng.randint(0, 40))
+                for _ in range(15):
+                    text = self.edit(text)
+                    self.assertEqual(analyzer.update(text).counts(), reference(text), (block_size, text))
+                    blocks = analyzer.blocks
+                    self.assertEqual("".join(text[start:end] for start, end, _ in blocks), text)
+                    self.assertTrue(all(a[1] == b[0] for a, b in zip(blocks, blocks[1:])))
+
+    def test_common_blocks(self):
+        analyzer = IncrementalAnalyzer(4)
+        text = "aaaa bbbb cccc dddd "
+        analyzer.update(text)
+        # A change in the third block keeps the two before and the two after
+        head, tail, shift = analyzer._common_blocks(text[:10] + "XX" + text[10:])
+        self.assertEqual((head, tail, shift), (2, 3, 2))
+        edited = text[:10] + "XX" + text[10:]
+        analyzer.update(edited)
+        self.assertEqual(analyzer.stats.counts(), reference(edited))
+        self.assertLessEqual(analyzer.rescanned, 3 * 4 + 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
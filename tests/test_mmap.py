@@ -0,0 +1,59 @@
+import os
+import random
+import tempfile
+import unittest
+
+import analysis
+from support import ALPHABET, random_text, reference
+
+
+class AnalyzeBufferTest(unittest.TestCase):
+    def test_chunk_sizes(self):
+        # ASCII windows are counted on the bytes; a window after a cut
+        # multibyte character must still be decoded
+        rng = random.Random(1)
+        for _ in range(500):
+            text = random_text(rng, rng.randint(0, 50))
+            data = text.encode("utf-8")
+            for chunk_size in (1, 2, 3, 7, 100):
+                self.assertEqual(analysis.analyze_buffer(data, chunk_size=chunk_size).counts(),
+                                 reference(text), (chunk_size, text))
+
+    def test_ascii_windows(self):
+        text = "Hello world. Is it me? Yes!\n" * 50
+        data = text.encode("ascii")
+        for chunk_size in (1, 5, 64, 4096):
+            self.assertEqual(analysis.analyze_buffer(data, chunk_size=chunk_size).counts(), reference(text))
+
+
+class AnalyzeMmapTest(unittest.TestCase):
+    def setUp(self):
+        rng = random.Random(2)
+        self.text = random_text(rng, 5000, ALPHABET + "éé\U0001F600")
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "text.txt")
+        with open(self.path, "w", encoding="utf-8", newline="") as f:
+            f.write(self.text)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_whole_file(self):
+        for chunk_size in (1, 97, 1 << 16):
+            self.assertEqual(analysis.analyze_mmap(self.path, chunk_size=chunk_size).counts(),
+                             reference(self.text))
+
+    def test_byte_range(self):
+        data = self.text.encode("utf-8")
+        start = len(self.text[:1000].encode("utf-8"))
+        end = len(self.text[:4000].encode("utf-8"))
+        self.assertEqual(analysis.analyze_mmap(self.path, start, end, chunk_size=97).counts(),
+                         reference(data[start:end].decode("utf-8")))
+
+    def test_empty_file(self):
+        open(self.path, "w").close()
+        self.assertEqual(analysis.analyze_mmap(self.path).counts(), reference(""))
+
+
+if __name__ == "__main__":
+    unittest.main()
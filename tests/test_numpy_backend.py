@@ -0,0 +1,48 @@
+import random
+import unittest
+
+import numpy_backend
+from analysis import LOCALE_VOWELS, TextStats
+from support import ALPHABET, random_text
+
+
+@unittest.skipUnless(numpy_backend.available(), "NumPy is not installed")
+class CountStatsTest(unittest.TestCase):
+    def assertMatchesTextStats(self, docs, locale=None, **options):
+        expected = [TextStats.of(doc, locale=locale).state() for doc in docs]
+        got = [stats.state() for stats in numpy_backend.count_stats(docs, locale=locale, **options)]
+        self.assertEqual(got, expected, (docs, options))
+
+    def test_groups_and_windows(self):
+        # Small max_chars splits documents into windows that are merged back,
+        # boundary flags included
+        rng = random.Random(1)
+        alphabets = (ALPHABET, "ab .!?\x1c", ALPHABET + "\U0001D400　")
+        for _ in range(300):
+            alphabet = rng.choice(alphabets)
+            docs = [random_text(rng, rng.randint(0, 40), alphabet) for _ in range(rng.randint(0, 8))]
+            self.assertMatchesTextStats(docs, max_chars=rng.choice([1, 3, 20, 1000]))
+
+    def test_mixed_ascii_and_unicode_windows(self):
+        doc = "Plain ascii words. " * 20 + "Ünïcödé wörds hère! " * 20 + "more ascii"
+        for max_chars in (7, 50, 1 << 20):
+            self.assertMatchesTextStats([doc, "", "é", "a"], max_chars=max_chars)
+
+    def test_locales(self):
+        rng = random.Random(2)
+        alphabet = "aeiouyäöüåéøæ AEIOUYÄÖ.!\nbcdxzßœёаы"
+        for locale in LOCALE_VOWELS:
+            docs = [random_text(rng, rng.randint(0, 60), alphabet) for _ in range(5)]
+            self.assertMatchesTextStats(docs, locale, max_chars=25)
+
+    def test_unknown_locale(self):
+        with self.assertRaises(ValueError):
+            numpy_backend.count_stats(["a"], locale="xx")
+
+    def test_count_batch(self):
+        rows = numpy_backend.count_batch(["Hello world.", "héllo"])
+        self.assertEqual(rows.tolist(), [[12, 2, 1, 3, 7], [5, 1, 1, 1, 4]])
+
+
+if __name__ == "__main__":
+    unittest.main()
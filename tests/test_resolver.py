@@ -0,0 +1,107 @@
+import asyncio
+import unittest
+
+from resolver import DomainResolver
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class StubLookup:
+    """Coroutine resolver that records how many lookups overlap."""
+
+    def __init__(self, delay=0.01, addresses=None, hang=()):
+        self.delay = delay
+        self.addresses = addresses or {}
+        self.hang = set(hang)
+        self.calls = []
+        self.active = 0
+        self.max_active = 0
+
+    async def __call__(self, domain):
+        self.calls.append(domain)
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            await asyncio.sleep(3600 if domain in self.hang else self.delay)
+            if domain not in self.addresses:
+                raise OSError(f"unknown host {domain}")
+            return self.addresses[domain]
+        finally:
+            self.active -= 1
+
+
+class DomainResolverTest(unittest.TestCase):
+    def make(self, stub, **options):
+        self.clock = FakeClock()
+        return DomainResolver(stub, clock=self.clock, **options)
+
+    def test_concurrency_limit(self):
+        domains = [f"host{i}.example" for i in range(20)]
+        stub = StubLookup(addresses={domain: "10.0.0.1" for domain in domains})
+        resolver = self.make(stub, concurrency=3)
+        seen = []
+        results = asyncio.run(resolver.resolve_all(domains, seen.append))
+        self.assertEqual(stub.max_active, 3)
+        self.assertEqual([r["domain"] for r in results], domains)
+        self.assertEqual(len(seen), len(domains))
+        self.assertTrue(all(r["address"] == "10.0.0.1" and not r["cached"] for r in results))
+
+    def test_timeout(self):
+        stub = StubLookup(addresses={"slow.example": "10.0.0.2", "fast.example": "10.0.0.3"},
+                          hang=["slow.example"])
+        resolver = self.make(stub, timeout=0.05)
+        slow, fast = asyncio.run(resolver.resolve_all(["slow.example", "fast.example"]))
+        self.assertIsNone(slow["address"])
+        self.assertIn("timed out", slow["error"])
+        self.assertEqual(fast["address"], "10.0.0.3")
+        self.assertEqual(stub.active, 0)
+
+    def test_ttl(self):
+        stub = StubLookup(addresses={"a.example": "10.0.0.4"})
+        resolver = self.make(stub, ttl=60)
+        first = asyncio.run(resolver.resolve("a.example"))
+        self.clock.now = 59
+        second = asyncio.run(resolver.resolve("a.example"))
+        self.assertFalse(first["cached"])
+        self.assertTrue(second["cached"])
+        self.assertEqual(second["address"], "10.0.0.4")
+        self.assertEqual(stub.calls, ["a.example"])
+        self.clock.now = 60
+        third = asyncio.run(resolver.resolve("a.example"))
+        self.assertFalse(third["cached"])
+        self.assertEqual(stub.calls, ["a.example", "a.example"])
+
+    def test_negative_caching(self):
+        stub = StubLookup()
+        resolver = self.make(stub, ttl=300, negative_ttl=10)
+        first = asyncio.run(resolver.resolve("missing.example"))
+        self.assertIn("unknown host", first["error"])
+        self.clock.now = 9
+        second = asyncio.run(resolver.resolve("missing.example"))
+        self.assertTrue(second["cached"])
+        self.assertEqual(second["error"], first["error"])
+        self.assertEqual(len(stub.calls), 1)
+        self.clock.now = 10
+        self.assertFalse(asyncio.run(resolver.resolve("missing.example"))["cached"])
+        self.assertEqual(len(stub.calls), 2)
+
+    def test_plain_and_coroutine_lookups(self):
+        # A blocking function runs on a thread; an awaitable result is awaited
+        async def later(domain):
+            await asyncio.sleep(0)
+            return "10.0.0.6"
+
+        lookups = [lambda domain: "10.0.0.5", later, lambda domain: later(domain)]
+        for lookup, address in zip(lookups, ["10.0.0.5", "10.0.0.6", "10.0.0.6"]):
+            result = asyncio.run(DomainResolver(lookup).resolve("b.example"))
+            self.assertEqual(result["address"], address)
+
+
+if __name__ == "__main__":
+    unittest.main()
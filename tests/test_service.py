@@ -0,0 +1,129 @@
+import asyncio
+import json
+import unittest
+
+from analysis import analyze
+from service import COALESCE_CHARS, AnalysisService
+
+
+async def read_response(reader):
+    status_line = await reader.readline()
+    if not status_line:
+        return None
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    body = await reader.readexactly(int(headers["content-length"]))
+    return int(status_line.split()[1]), headers, json.loads(body)
+
+
+def request(method, path, body=b"", content_type="application/json", extra=""):
+    if not isinstance(body, bytes):
+        body = json.dumps(body).encode("utf-8")
+    return (f"{method} {path} HTTP/1.1\r\nContent-Type: {content_type}\r\n"
+            f"Content-Length: {len(body)}\r\n{extra}\r\n").encode("latin-1") + body
+
+
+class AnalysisServiceTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.service = AnalysisService(workers=1)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.service.close()
+
+    def exchange(self, *raw_requests, responses=None):
+        # Send raw requests on one connection; return the responses and
+        # whether the server then closed the connection
+        async def run():
+            server = await asyncio.start_server(self.service.handle_connection, "127.0.0.1", 0)
+            async with server:
+                port = server.sockets[0].getsockname()[1]
+                reader, writer = await asyncio.open_connection("127.0.0.1", port)
+                writer.write(b"".join(raw_requests))
+                await writer.drain()
+                results = []
+                for _ in range(responses or len(raw_requests)):
+                    results.append(await read_response(reader))
+                closed = await asyncio.wait_for(reader.read(1), 5) == b""
+                writer.close()
+                return results, closed
+
+        return asyncio.run(run())
+
+    def test_keep_alive(self):
+        (first, second, third), closed = self.exchange(
+            request("POST", "/analyze", {"text": "Hello world."}),
+            request("GET", "/health"),
+            request("POST", "/analyze", {"text": "Bye."}, extra="Connection: close\r\n"))
+        self.assertEqual(first[0], 200)
+        self.assertEqual(first[1]["connection"], "keep-alive")
+        self.assertEqual(first[2], analyze("Hello world.").as_dict())
+        self.assertEqual(second[2], {"status": "ok"})
+        self.assertEqual(third[1]["connection"], "close")
+        self.assertTrue(closed)
+
+    def test_plain_text_and_conversions(self):
+        (plain, subset), _ = self.exchange(
+            request("POST", "/analyze", "ab cd".encode(), "text/plain; charset=utf-8"),
+            request("POST", "/analyze", {"text": "ab cd", "conversions": ["upper"]},
+                    extra="Connection: close\r\n"))
+        self.assertEqual(plain[2], analyze("ab cd").as_dict())
+        self.assertEqual(subset[2], analyze("ab cd").as_dict(["upper"]))
+
+    def test_batch(self):
+        texts = [f"Document {i}. Words here!" for i in range(40)] + ["same"] * 3 + [""]
+        before = self.service.batcher.documents
+        (response,), _ = self.exchange(request("POST", "/batch", {"texts": texts},
+                                               extra="Connection: close\r\n"))
+        self.assertEqual(response[0], 200)
+        self.assertEqual(response[2]["results"], [analyze(text).as_dict() for text in texts])
+        # Identical texts share one job
+        self.assertLessEqual(self.service.batcher.documents - before, len(texts) - 2)
+
+    def test_large_document(self):
+        text = "Large text. " * (COALESCE_CHARS // 10)
+        (first, cached), _ = self.exchange(
+            request("POST", "/analyze", {"text": text, "conversions": ["reversed"]}),
+            request("POST", "/analyze", {"text": text, "conversions": ["lower"]},
+                    extra="Connection: close\r\n"))
+        self.assertEqual(first[2], analyze(text).as_dict(["reversed"]))
+        self.assertEqual(cached[2], analyze(text).as_dict(["lower"]))
+
+    def test_request_errors_keep_connection(self):
+        (bad_json, bad_conversion, missing, wrong_method), closed = self.exchange(
+            request("POST", "/analyze", b"{nope"),
+            request("POST", "/batch", {"texts": ["a"], "conversions": ["sideways"]}),
+            request("GET", "/nothing"),
+            request("GET", "/analyze", extra="Connection: close\r\n"))
+        self.assertEqual([r[0] for r in (bad_json, bad_conversion, missing, wrong_method)],
+                         [400, 400, 404, 405])
+        self.assertEqual(bad_json[1]["connection"], "keep-alive")
+        self.assertTrue(closed)
+
+    def test_framing_errors_close_connection(self):
+        for length in ("-1", "1_0", " 5x", "٣", "4, 4"):
+            raw = (f"POST /analyze HTTP/1.1\r\nContent-Length: {length}\r\n\r\n".encode("utf-8")
+                   + b'{"text": "a"}' + request("GET", "/health"))
+            (response,), closed = self.exchange(raw, responses=1)
+            self.assertEqual(response[0], 400, length)
+            self.assertEqual(response[1]["connection"], "close")
+            self.assertTrue(closed, length)
+        raw = (b"POST /analyze HTTP/1.1\r\nContent-Length: 2\r\nContent-Length: 13\r\n\r\n"
+               + b'{"text": "a"}')
+        (response,), closed = self.exchange(raw, responses=1)
+        self.assertEqual(response[0], 400)
+        self.assertTrue(closed)
+        (response,), closed = self.exchange(b"POST /analyze HTTP/1.1\r\nTransfer-Encoding: chunked\r\n\r\n",
+                                            responses=1)
+        self.assertEqual(response[0], 411)
+        self.assertTrue(closed)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,76 @@
+import os
+import tempfile
+import unittest
+
+from analysis import TextStats
+from store import DEFAULT_RETENTION, EntryStore
+
+
+class EntryStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.store = EntryStore(os.path.join(self.tmp.name, "store.sqlite3"))
+
+    def tearDown(self):
+        self.store.close()
+        self.tmp.cleanup()
+
+    def test_dedup_keeps_position(self):
+        self.assertTrue(self.store.add("history", "one"))
+        self.assertTrue(self.store.add("history", "two"))
+        self.assertFalse(self.store.add("history", "one"))
+        self.assertEqual(self.store.texts("history"), ["two", "one"])
+        # Kinds are separate
+        self.assertTrue(self.store.add("favorites", "one"))
+
+    def test_stats_refreshed_on_duplicate(self):
+        self.store.add("history", "a b")
+        self.assertIsNone(self.store.stats("history", "a b"))
+        self.store.add("history", "a b", TextStats.of("a b"))
+        self.assertEqual(self.store.stats("history", "a b").counts(), TextStats.of("a b").counts())
+        # Adding without stats keeps the stored ones
+        self.store.add("history", "a b")
+        self.assertIsNotNone(self.store.stats("history", "a b"))
+
+    def test_prune_on_add(self):
+        for i in range(DEFAULT_RETENTION + 5):
+            self.store.add("history", f"text {i}")
+        texts = self.store.texts("history")
+        self.assertEqual(len(texts), DEFAULT_RETENTION)
+        self.assertEqual(texts[0], f"text {DEFAULT_RETENTION + 4}")
+        self.assertEqual(texts[-1], "text 5")
+
+    def test_set_retention(self):
+        for i in range(6):
+            self.store.add("history", f"text {i}")
+            self.store.add("favorites", f"fav {i}")
+        self.store.set_retention("history", 2)
+        self.assertEqual(self.store.retention("history"), 2)
+        self.assertEqual(self.store.texts("history"), ["text 5", "text 4"])
+        self.assertEqual(len(self.store.texts("favorites")), 6)
+        self.store.add("history", "text 6")
+        self.assertEqual(self.store.texts("history"), ["text 6", "text 5"])
+
+    def test_multiline_text(self):
+        text = "line one\nline two\r\n"
+        self.store.add("favorites", text)
+        self.assertEqual(self.store.texts("favorites"), [text])
+
+    def test_import_lines_once(self):
+        path = os.path.join(self.tmp.name, "history.txt")
+        with open(path, "w") as f:
+            f.write("newest\nolder\n\noldest\n")
+        self.store.import_lines("history", path)
+        self.store.clear("history")
+        self.store.import_lines("history", path)
+        self.assertEqual(self.store.texts("history"), [])
+        fresh = EntryStore(os.path.join(self.tmp.name, "other.sqlite3"))
+        try:
+            fresh.import_lines("history", path)
+            self.assertEqual(fresh.texts("history"), ["newest", "older", "oldest"])
+        finally:
+            fresh.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,64 @@
+import contextlib
+import io
+import json
+import os
+import random
+import tempfile
+import unittest
+
+import analysis
+import TextInfo
+from support import random_text, reference
+
+
+class AnalyzeStreamTest(unittest.TestCase):
+    def test_chunk_sizes(self):
+        # Chunks cut words, sentences and multibyte characters anywhere
+        rng = random.Random(1)
+        for _ in range(500):
+            text = random_text(rng, rng.randint(0, 50))
+            data = text.encode("utf-8")
+            for chunk_size in (1, 2, 3, 7, 100):
+                self.assertEqual(analysis.analyze_stream(io.BytesIO(data), chunk_size).counts(),
+                                 reference(text), (chunk_size, text))
+
+    def test_invalid_utf8_is_replaced(self):
+        stats = analysis.analyze_stream(io.BytesIO(b"ab \xff cd"), 2)
+        self.assertEqual(stats.counts(), reference("ab � cd"))
+
+
+class FileModeTest(unittest.TestCase):
+    def run_main(self, argv):
+        out = io.StringIO()
+        code = 0
+        with contextlib.redirect_stdout(out):
+            try:
+                TextInfo.main(argv)
+            except SystemExit as e:
+                code = e.code
+        return code, [json.loads(line) for line in out.getvalue().splitlines()]
+
+    def test_unreadable_file_gets_error_record(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            good = os.path.join(tmp, "good.txt")
+            with open(good, "w") as f:
+                f.write("Hello world. Bye!")
+            missing = os.path.join(tmp, "missing.txt")
+            code, records = self.run_main(["--stream", missing, good])
+        self.assertEqual(code, 1)
+        self.assertEqual(records[0]["file"], missing)
+        self.assertIn("error", records[0])
+        self.assertEqual(records[1], {"file": good, **reference("Hello world. Bye!")})
+
+    def test_all_readable_exits_zero(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "a.txt")
+            with open(path, "w") as f:
+                f.write("one two")
+            code, records = self.run_main([path])
+        self.assertFalse(code)
+        self.assertEqual(records, [{"file": path, **reference("one two")}])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,67 @@
+import random
+import types
+import unittest
+
+from analysis import CONVERSIONS, render_window
+from convert import reverse_graphemes
+from widgets import VirtualTextView
+
+
+def layout(text, reverse):
+    # The line layout methods of VirtualTextView, without a Tk window
+    view = types.SimpleNamespace(source=text, reverse=reverse, length=len(text))
+    for name in ("_find_newline", "_rfind_newline", "next_line", "prev_line", "page_end"):
+        setattr(view, name, getattr(VirtualTextView, name).__get__(view))
+    return view
+
+
+def line_starts(view, columns):
+    starts = [0]
+    while starts[-1] < view.length:
+        starts.append(view.next_line(starts[-1], columns))
+    return starts
+
+
+class RenderWindowTest(unittest.TestCase):
+    def test_exact_page(self):
+        text = "alpha bravo charlie delta echo foxtrot"
+        self.assertEqual(render_window(text, "original", 10, 20), "o charlie ")
+        self.assertEqual(render_window(text, "upper", 10, 20), "O CHARLIE ")
+        # The page starts mid-word, so title case must not capitalise it
+        self.assertEqual(render_window(text, "title", 10, 20), "o Charlie ")
+
+    def test_pages_join_up(self):
+        rng = random.Random(1)
+        for _ in range(2000):
+            text = "".join(rng.choice("ab ΣσİßﬁǆAB\n.   ") for _ in range(rng.randint(0, 200)))
+            cuts = sorted(rng.sample(range(len(text) + 1), min(len(text) + 1, rng.randint(0, 10))))
+            bounds = [0] + cuts + [len(text)]
+            for name in ("original", "lower", "upper", "title", "reversed"):
+                pages = "".join(render_window(text, name, a, b) for a, b in zip(bounds, bounds[1:]))
+                whole = text if name == "original" else CONVERSIONS[name](text)
+                self.assertEqual(pages, whole, (name, text, bounds))
+
+
+class LineLayoutTest(unittest.TestCase):
+    def test_lines(self):
+        view = layout("ab\n\nabcdefg\nxyz", False)
+        self.assertEqual(line_starts(view, 3), [0, 3, 4, 7, 10, 12, 15])
+        # A newline straight after a full row ends that row
+        self.assertEqual(line_starts(layout("abc\nd", False), 3), [0, 4, 5])
+
+    def test_reversed_matches_rendered_text(self):
+        # Reverse mode lays out the source as if it were the reversed text
+        rng = random.Random(2)
+        for _ in range(2000):
+            text = "".join(rng.choice(["a", "b", " ", "\n", "\r\n"]) for _ in range(rng.randint(0, 40)))
+            columns = rng.randint(1, 8)
+            forward, backward = layout(reverse_graphemes(text), False), layout(text, True)
+            starts = line_starts(forward, columns)
+            self.assertEqual(line_starts(backward, columns), starts, (text, columns))
+            for view in (forward, backward):
+                for previous, start in zip(starts, starts[1:]):
+                    self.assertEqual(view.prev_line(start, columns), previous, (text, columns))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,159 @@
+import tkinter as tk
+from tkinter import font as tkfont
+from tkinter import ttk
+
+
+class VirtualTextView(ttk.Frame):
+    """Read-only text pane that only renders the part of its source in view.
+
+    The source is given as a length and a render(start, end) callback, so a
+    conversion of a huge text is computed one screenful at a time. The
+    scrollbar maps to character offsets in the source, and nothing is
+    rendered while the pane is not mapped (e.g. on a hidden notebook tab).
+
+    When the source text is given too, the view is laid out in display lines:
+    a line ends at a newline or after a full row of characters, so pages and
+    scroll steps follow what is on screen. `reverse` says the rendered text
+    reads the source from its end, as the reversed conversion does.
+    """
+
+    def __init__(self, master, height=6, **text_options):
+        super().__init__(master)
+        self.length = 0
+        self.offset = 0
+        self.render = None
+        self.source = None
+        self.reverse = False
+        self.stale = False
+        self.font = tkfont.nametofont("TkFixedFont")
+        self.text = tk.Text(self, height=height, wrap="char", font=self.font,
+                            state="disabled", **text_options)
+        self.text.grid(row=0, column=0, sticky="nsew")
+        self.scroll = ttk.Scrollbar(self, orient="vertical", command=self.on_scroll)
+        self.scroll.grid(row=0, column=1, sticky="ns")
+        self.columnconfigure(0, weight=1)
+        self.rowconfigure(0, weight=1)
+        self.scroll.set(0, 1)
+
+        self.bind("<Map>", lambda e: self.refresh())
+        self.text.bind("<Configure>", lambda e: self.invalidate())
+        self.text.bind("<MouseWheel>", lambda e: self.on_scroll("scroll", -1 if e.delta > 0 else 1, "units"))
+        self.text.bind("<Button-4>", lambda e: self.on_scroll("scroll", -1, "units"))
+        self.text.bind("<Button-5>", lambda e: self.on_scroll("scroll", 1, "units"))
+
+    def page_geometry(self):
+        # Characters per line and lines in view, from the fixed-width font
+        columns = max(self.text.winfo_width() // max(self.font.measure("0"), 1), 1)
+        lines = max(self.text.winfo_height() // max(self.font.metrics("linespace"), 1), 1)
+        return columns, lines
+
+    def set_source(self, length, render, text=None, reverse=False):
+        self.length = length
+        self.render = render
+        self.source = text
+        self.reverse = reverse
+        self.offset = 0
+        self.invalidate()
+
+    def _find_newline(self, start, end):
+        # First view offset in [start, end) that shows a newline, or -1
+        text = self.source
+        if not self.reverse:
+            return text.find("\n", start, end)
+        # View offset p shows text[n - 1 - p], except that CRLF pairs are
+        # kept in order, which moves their newline one place on
+        n = len(text)
+        i = text.rfind("\n", max(n - end - 1, 0), n - start + 1)
+        while i >= 0:
+            p = n - i if i and text[i - 1] == "\r" else n - 1 - i
+            if p >= start:
+                return p if p < end else -1
+            i = text.rfind("\n", max(n - end - 1, 0), i)
+        return -1
+
+    def _rfind_newline(self, start, end):
+        # Last view offset in [start, end) that shows a newline, or -1
+        text = self.source
+        if not self.reverse:
+            return text.rfind("\n", start, end)
+        n = len(text)
+        i = text.find("\n", max(n - end - 1, 0), n - start + 1)
+        while i >= 0:
+            p = n - i if i and text[i - 1] == "\r" else n - 1 - i
+            if start <= p < end:
+                return p
+            i = text.find("\n", i + 1, n - start + 1)
+        return -1
+
+    def next_line(self, pos, columns):
+        # Start of the display line after the one starting at pos. A newline
+        # right after a full row ends that row rather than adding an empty one.
+        if self.source is not None:
+            i = self._find_newline(pos, min(pos + columns + 1, self.length))
+            if i >= 0:
+                return i + 1
+        return min(pos + columns, self.length)
+
+    def prev_line(self, pos, columns):
+        # Start of the display line holding the character before pos
+        if pos <= 0:
+            return 0
+        if self.source is None:
+            return (pos - 1) // columns * columns
+        line = self._rfind_newline(0, pos - 1) + 1
+        row = pos - 1 - line
+        if row and self._find_newline(pos - 1, pos) == pos - 1:
+            row -= 1
+        return line + row // columns * columns
+
+    def page_end(self, offset, columns, lines):
+        end = offset
+        for _ in range(lines):
+            if end >= self.length:
+                break
+            end = self.next_line(end, columns)
+        return end
+
+    def invalidate(self):
+        self.stale = True
+        self.refresh()
+
+    def refresh(self):
+        if not self.stale or not self.winfo_ismapped():
+            return
+        self.stale = False
+        columns, lines = self.page_geometry()
+        end = self.page_end(self.offset, columns, lines)
+        content = self.render(self.offset, end) if self.render and end > self.offset else ""
+        self.text.configure(state="normal")
+        self.text.delete("1.0", tk.END)
+        self.text.insert("1.0", content)
+        self.text.configure(state="disabled")
+        if self.length:
+            self.scroll.set(self.offset / self.length, end / self.length)
+        else:
+            self.scroll.set(0, 1)
+
+    def scroll_to(self, offset):
+        # offset must be the start of a display line; the last page is kept full
+        columns, lines = self.page_geometry()
+        last = self.length
+        for _ in range(lines):
+            last = self.prev_line(last, columns)
+        offset = max(0, min(offset, last))
+        if offset != self.offset:
+            self.offset = offset
+            self.invalidate()
+
+    def on_scroll(self, action, amount, unit=None):
+        columns, lines = self.page_geometry()
+        if action == "moveto":
+            target = min(max(int(float(amount) * self.length), 0), self.length)
+            self.scroll_to(self.prev_line(target + 1, columns) if target < self.length else target)
+        elif action == "scroll":
+            steps = int(amount) * (lines if unit == "pages" else 1)
+            offset = self.offset
+            for _ in range(abs(steps)):
+                offset = self.next_line(offset, columns) if steps > 0 else self.prev_line(offset, columns)
+            self.scroll_to(offset)
+        return "break"